@@ -1,16 +1,25 @@
 import json
-import re
-import sqlite3
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
+from datetime import datetime
+from difflib import SequenceMatcher
 from pathlib import Path
 
-from transfer_search import search_fastest_one_transfer
+from departures import STATION_RADIUS_M, departure_board, next_departures
+from gtfs_time import secs_to_clock, time_to_secs
+from headways import lookup_headways
+from od_table import fastest_one_transfer
+from question_parser import parse_question
+from realtime import DELAYS
+from service_summary import schedule_summary
+from single_flight import SINGLE_FLIGHT, bucket_time
+from snapshots import connect_snapshot, current_snapshot
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
 DEFAULTS_PATH = BASE_DIR / "db" / "answering_defaults.json"
+RT_CANDIDATES = 3
+HEADSIGN_MATCH_RATIO = 0.8  # SequenceMatcher ratio for a misspelled headsign
 
 
 @dataclass
@@ -40,71 +49,24 @@ def load_defaults():
 
 
 def parse_route(text):
-    m = re.search(r"\broute\s+(\d+)\b", text, re.IGNORECASE)
-    return m.group(1) if m else None
+    return parse_question(text).route
 
 
 def parse_date(text):
-    text = text.lower()
-    today = date.today()
-
-    iso = re.search(r"\b(20\d{2})-(\d{2})-(\d{2})\b", text)
-    if iso:
-        return date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
-
-    mdY = re.search(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b", text)
-    if mdY:
-        return date(int(mdY.group(3)), int(mdY.group(1)), int(mdY.group(2)))
-
-    weekdays = {
-        "monday": 0,
-        "tuesday": 1,
-        "wednesday": 2,
-        "thursday": 3,
-        "friday": 4,
-        "saturday": 5,
-        "sunday": 6,
-    }
-    for name, idx in weekdays.items():
-        if name in text:
-            days_ahead = (idx - today.weekday()) % 7
-            if days_ahead == 0:
-                return today
-            return today + timedelta(days=days_ahead)
-
-    if "today" in text:
-        return today
-    if "tomorrow" in text:
-        return today + timedelta(days=1)
-    return today
+    return parse_question(text).date
 
 
 def parse_time(text):
-    text = text.lower()
-    m = re.search(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", text)
-    if not m:
-        return None
-    hour = int(m.group(1))
-    minute = int(m.group(2) or 0)
-    ampm = m.group(3)
-    if ampm == "pm" and hour != 12:
-        hour += 12
-    if ampm == "am" and hour == 12:
-        hour = 0
-    return f"{hour:02d}:{minute:02d}:00"
+    return parse_question(text).time
 
 
 def extract_from_to(text):
-    m = re.search(r"\bfrom\s+(.+?)\s+to\s+(.+?)(?:\s+on|\s+at|\s+around|\?|$)", text, re.IGNORECASE)
-    if not m:
-        return None, None
-    return m.group(1).strip(), m.group(2).strip()
+    parsed = parse_question(text)
+    return parsed.from_text, parsed.to_text
 
 
 def connect_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return connect_snapshot(current_snapshot(DB_PATH))
 
 
 def find_stop_by_alias(text, defaults):
@@ -119,14 +81,11 @@ def find_stops_like(conn, name_like, route_short_name=None):
     params = {"like": f"%{name_like}%"}
     if route_short_name:
         sql = """
-        SELECT DISTINCT s.stop_id_padded, s.stop_name
-        FROM stops s
-        JOIN stop_times st ON st.stop_id = s.stop_id
-        JOIN trips t ON t.trip_id = st.trip_id
-        JOIN routes r ON r.route_id = t.route_id
-        WHERE r.route_short_name = :route
-          AND s.stop_name LIKE :like
-        ORDER BY s.stop_name;
+        SELECT DISTINCT stop_id_padded, stop_name
+        FROM route_stops
+        WHERE route_short_name = :route
+          AND stop_name LIKE :like
+        ORDER BY stop_name;
         """
         params["route"] = route_short_name
     else:
@@ -148,16 +107,13 @@ def find_stops_fuzzy(conn, name_text, route_short_name=None):
     params = {"pattern": pattern}
     if route_short_name:
         sql = """
-        SELECT DISTINCT s.stop_id_padded, s.stop_name
+        SELECT DISTINCT rs.stop_id_padded, rs.stop_name
         FROM fuzzy_lookup f
-        JOIN stops s ON s.stop_id = f.entity_id
-        JOIN stop_times st ON st.stop_id = s.stop_id
-        JOIN trips t ON t.trip_id = st.trip_id
-        JOIN routes r ON r.route_id = t.route_id
+        JOIN route_stops rs ON rs.stop_id = f.entity_id
         WHERE f.entity_type = 'stop'
           AND f.normalized LIKE :pattern
-          AND r.route_short_name = :route
-        ORDER BY s.stop_name;
+          AND rs.route_short_name = :route
+        ORDER BY rs.stop_name;
         """
         params["route"] = route_short_name
     else:
@@ -173,128 +129,133 @@ def find_stops_fuzzy(conn, name_text, route_short_name=None):
     return [StopCandidate(r["stop_id_padded"], r["stop_name"]) for r in rows]
 
 
+def match_route_headsign(conn, route_short_name, text):
+    """The route's headsign that text names, or None.
+
+    "to"/"toward" in a question often just starts a clause ("I want to know
+    when ..."), so a captured phrase only counts as a headsign when it is part
+    of one of the route's headsigns or close to it.
+    """
+    norm = normalize_text(text).removeprefix("to ")
+    if not norm:
+        return None
+    best, best_score = None, HEADSIGN_MATCH_RATIO
+    for (headsign,) in conn.execute(
+        "SELECT DISTINCT t.trip_headsign FROM trips t "
+        "JOIN routes r ON r.route_id = t.route_id "
+        "WHERE r.route_short_name = ? AND t.trip_headsign IS NOT NULL;",
+        (route_short_name,),
+    ):
+        key = normalize_text(headsign).removeprefix("to ")
+        score = 1.0 if norm in key else SequenceMatcher(None, norm, key).ratio()
+        if score >= best_score:
+            best, best_score = headsign, score
+    return best
+
+
 def next_departures_per_headsign(conn, route_short_name, stop_id_padded, date_str, time_str):
+    # service_days also lists the previous day's services that run past 24:00,
+    # with day_offset = 86400, so late-night trips share one seconds timeline.
+    # A few scheduled candidates per headsign are read so the real-time overlay
+    # can pick the first one still predicted to leave after time_str.
     sql = """
-    WITH base_services AS (
-      SELECT c.service_id
-      FROM calendar c
-      WHERE :date BETWEEN c.start_date AND c.end_date
-        AND (
-          (c.monday = 1 AND strftime('%w', :date) = '1') OR
-          (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-          (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-          (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-          (c.friday = 1 AND strftime('%w', :date) = '5') OR
-          (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-          (c.sunday = 1 AND strftime('%w', :date) = '0')
-        )
-    ),
-    exception_add AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 1
-    ),
-    exception_remove AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 2
-    ),
-    active_services AS (
-      SELECT service_id FROM base_services
-      UNION
-      SELECT service_id FROM exception_add
-      EXCEPT
-      SELECT service_id FROM exception_remove
-    ),
-    ranked AS (
-      SELECT st.departure_time, t.trip_headsign,
-             ROW_NUMBER() OVER (PARTITION BY t.trip_headsign ORDER BY st.departure_time) AS rn
+    WITH ranked AS (
+      SELECT st.departure_secs - sd.day_offset AS dep_secs, t.trip_headsign,
+             st.trip_id, st.stop_sequence, sd.day_offset,
+             ROW_NUMBER() OVER (
+               PARTITION BY t.trip_headsign
+               ORDER BY st.departure_secs - sd.day_offset
+             ) AS rn
       FROM stops s
       JOIN stop_times st ON st.stop_id = s.stop_id
       JOIN trips t ON t.trip_id = st.trip_id
       JOIN routes r ON r.route_id = t.route_id
-      JOIN active_services a ON a.service_id = t.service_id
+      JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
       WHERE r.route_short_name = :route
         AND s.stop_id_padded = :stop_id
-        AND st.departure_time >= :time
+        AND st.departure_secs >= :after_secs + sd.day_offset
     )
-    SELECT departure_time, trip_headsign
+    SELECT dep_secs, trip_headsign, trip_id, stop_sequence, day_offset
     FROM ranked
-    WHERE rn = 1
-    ORDER BY departure_time;
+    WHERE rn <= :candidates
+    ORDER BY trip_headsign, rn;
     """
-    return conn.execute(
+    after_secs = time_to_secs(time_str) or 0
+    rows = conn.execute(
         sql,
-        {"date": date_str, "route": route_short_name, "stop_id": stop_id_padded, "time": time_str},
+        {
+            "date": date_str,
+            "route": route_short_name,
+            "stop_id": stop_id_padded,
+            "after_secs": after_secs,
+            "candidates": RT_CANDIDATES,
+        },
     ).fetchall()
 
+    best = {}
+    for r in rows:
+        if DELAYS.canceled(r["trip_id"], date_str, r["day_offset"]):
+            continue
+        predicted = DELAYS.predict(
+            r["trip_id"], r["stop_sequence"], r["dep_secs"], date_str, r["day_offset"]
+        )
+        if predicted < after_secs:
+            continue
+        current = best.get(r["trip_headsign"])
+        if current is None or predicted < current[0]:
+            best[r["trip_headsign"]] = (predicted, r)
+    return [
+        {
+            "departure_time": secs_to_clock(r["dep_secs"]),
+            "departure_secs": r["dep_secs"],
+            "predicted_departure_time": secs_to_clock(predicted),
+            "predicted_departure_secs": predicted,
+            "delay_secs": predicted - r["dep_secs"],
+            "trip_id": r["trip_id"],
+            "trip_headsign": r["trip_headsign"],
+        }
+        for predicted, r in sorted(best.values(), key=lambda b: b[0])
+    ]
+
 
 def first_or_last_departure(conn, route_short_name, stop_id_padded, date_str, first=True):
+    """First/last departure on the date's seconds timeline, which includes the
+    previous service day's trips past 24:00 (but not its trips before midnight)."""
     sql = """
-    WITH base_services AS (
-      SELECT c.service_id
-      FROM calendar c
-      WHERE :date BETWEEN c.start_date AND c.end_date
-        AND (
-          (c.monday = 1 AND strftime('%w', :date) = '1') OR
-          (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-          (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-          (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-          (c.friday = 1 AND strftime('%w', :date) = '5') OR
-          (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-          (c.sunday = 1 AND strftime('%w', :date) = '0')
-        )
-    ),
-    exception_add AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 1
-    ),
-    exception_remove AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 2
-    ),
-    active_services AS (
-      SELECT service_id FROM base_services
-      UNION
-      SELECT service_id FROM exception_add
-      EXCEPT
-      SELECT service_id FROM exception_remove
-    ),
-    departures AS (
-      SELECT st.departure_time
-      FROM stops s
-      JOIN stop_times st ON st.stop_id = s.stop_id
-      JOIN trips t ON t.trip_id = st.trip_id
-      JOIN routes r ON r.route_id = t.route_id
-      JOIN active_services a ON a.service_id = t.service_id
-      WHERE r.route_short_name = :route
-        AND s.stop_id_padded = :stop_id
-    )
-    SELECT {agg}(departure_time) AS result
-    FROM departures;
+    SELECT {agg}(st.departure_secs - sd.day_offset) AS dep_secs
+    FROM stops s
+    JOIN stop_times st ON st.stop_id = s.stop_id
+    JOIN trips t ON t.trip_id = st.trip_id
+    JOIN routes r ON r.route_id = t.route_id
+    JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
+    WHERE r.route_short_name = :route
+      AND s.stop_id_padded = :stop_id
+      AND st.departure_secs >= sd.day_offset;
     """.format(
         agg="MIN" if first else "MAX"
     )
     row = conn.execute(
         sql, {"date": date_str, "route": route_short_name, "stop_id": stop_id_padded}
     ).fetchone()
-    return row["result"] if row else None
+    if not row or row["dep_secs"] is None:
+        return None
+    return secs_to_clock(row["dep_secs"])
 
 
-def answer_question(question):
+def answer_question(question, conn=None):
     defaults = load_defaults()
-    route = parse_route(question)
-    q_date = parse_date(question)
-    q_time = parse_time(question)
-    date_str = q_date.strftime("%Y-%m-%d")
-
-    conn = connect_db()
+    parsed = parse_question(question)
+    route = parsed.route
+    q_time = parsed.time
+    date_str = parsed.date.strftime("%Y-%m-%d")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_db()
     try:
         # Fastest way (transfer search)
-        if "fastest" in question.lower() and "from" in question.lower() and "to" in question.lower():
-            from_text, to_text = extract_from_to(question)
+        if parsed.kind == "fastest":
+            from_text, to_text = parsed.from_text, parsed.to_text
             if not from_text or not to_text:
                 return "I need both origin and destination (from X to Y)."
 
@@ -317,25 +278,94 @@ def answer_question(question):
                     names = ", ".join([c.stop_name for c in candidates[:5]])
                     return f"Multiple destination stops match '{to_text}': {names}."
 
-            time_str = q_time or "00:00:00"
-            result = search_fastest_one_transfer(
+            time_str = bucket_time(q_time or "00:00:00")
+            from_id, to_id = from_alias.stop_id_padded, to_alias.stop_id_padded
+            result = SINGLE_FLIGHT.do(
+                ("search_fastest_one_transfer", date_str, time_str, from_id, to_id),
+                fastest_one_transfer,
                 date=date_str,
                 time=time_str,
-                from_stop_id_padded=from_alias.stop_id_padded,
-                to_stop_id_padded=to_alias.stop_id_padded,
+                from_stop_id_padded=from_id,
+                to_stop_id_padded=to_id,
                 limit=3,
+                conn=conn,
             )
             return format_response(question, result)
 
+        # Departure board (all routes at a stop or station)
+        if parsed.kind == "board":
+            stop = find_stop_by_alias(parsed.stop_text or question, defaults)
+            if not stop and parsed.stop_text:
+                candidates = find_stops_like(conn, parsed.stop_text)
+                if len(candidates) > 1:
+                    names = ", ".join([c.stop_name for c in candidates[:5]])
+                    return f"Multiple stops match '{parsed.stop_text}': {names}."
+                stop = candidates[0] if candidates else None
+            if not stop:
+                return "Which stop? (e.g., 'what's leaving the hub now?')"
+            time_str = q_time or datetime.now().strftime("%H:%M:%S")
+            board = departure_board(
+                conn,
+                stop.stop_id_padded,
+                date_str,
+                time_str,
+                limit=10,
+                radius_m=STATION_RADIUS_M,
+            )
+            return format_response(
+                question,
+                {
+                "stop": stop.stop_name,
+                "date": date_str,
+                "time": time_str,
+                "board": board["departures"],
+                },
+            )
+
         if not route:
             return "Please include a route number (e.g., 'route 5')."
 
+        # How often (scheduled headway)
+        if parsed.kind == "headway":
+            stop = find_stop_by_alias(parsed.stop_text or question, defaults)
+            hour = int(q_time[:2]) if q_time else None
+            rows = lookup_headways(
+                conn, route, date_str, stop.stop_id_padded if stop else None, hour
+            )
+            return format_response(
+                question,
+                {
+                "route": route,
+                "stop": stop.stop_name if stop else None,
+                "date": date_str,
+                "hour": hour,
+                "headways": rows,
+                },
+            )
+
+        # Multi-day summary (this week / next week)
+        if parsed.kind == "week":
+            stop = find_stop_by_alias(parsed.stop_text or question, defaults)
+            end_str = parsed.end_date.strftime("%Y-%m-%d")
+            days = schedule_summary(
+                conn, route, date_str, end_str, stop.stop_id_padded if stop else None
+            )
+            return format_response(
+                question,
+                {
+                "route": route,
+                "stop": stop.stop_name if stop else None,
+                "start_date": date_str,
+                "end_date": end_str,
+                "days": days,
+                },
+            )
+
         stop = find_stop_by_alias(question, defaults)
         if not stop:
-            # try to extract a stop name after 'from' or 'leaving'
-            m = re.search(r"(from|leaving)\s+(.+?)(?:\s+on|\s+at|\s+around|\?|$)", question, re.IGNORECASE)
-            if m:
-                stop_term = m.group(2).strip()
+            # stop name after 'from', 'leaving' or 'at', else the last two words
+            stop_term = parsed.stop_text
+            if stop_term:
                 candidates = find_stops_like(conn, stop_term, route)
             else:
                 candidates = find_stops_like(conn, " ".join(question.split()[-2:]), route)
@@ -346,7 +376,7 @@ def answer_question(question):
                 names = ", ".join([c.stop_name for c in candidates[:5]])
                 return f"Multiple stops on route {route} match: {names}."
             else:
-                fuzzy = find_stops_fuzzy(conn, stop_term if m else question, route)
+                fuzzy = find_stops_fuzzy(conn, stop_term or question, route)
                 if len(fuzzy) == 1:
                     stop = fuzzy[0]
                 elif len(fuzzy) > 1:
@@ -356,8 +386,16 @@ def answer_question(question):
                     return "I couldn't find a matching stop on that route."
 
         # Last / First
-        if "last" in question.lower():
-            last_time = first_or_last_departure(conn, route, stop.stop_id_padded, date_str, first=False)
+        if parsed.kind == "last":
+            last_time = SINGLE_FLIGHT.do(
+                ("first_or_last_departure", route, stop.stop_id_padded, date_str, False),
+                first_or_last_departure,
+                conn,
+                route,
+                stop.stop_id_padded,
+                date_str,
+                first=False,
+            )
             return format_response(
                 question,
                 {
@@ -367,8 +405,16 @@ def answer_question(question):
                 "last_departure": last_time,
                 },
             )
-        if "first" in question.lower():
-            first_time = first_or_last_departure(conn, route, stop.stop_id_padded, date_str, first=True)
+        if parsed.kind == "first":
+            first_time = SINGLE_FLIGHT.do(
+                ("first_or_last_departure", route, stop.stop_id_padded, date_str, True),
+                first_or_last_departure,
+                conn,
+                route,
+                stop.stop_id_padded,
+                date_str,
+                first=True,
+            )
             return format_response(
                 question,
                 {
@@ -379,9 +425,45 @@ def answer_question(question):
                 },
             )
 
+        # Next / closest with time, filtered to one direction or headsign
+        headsign = None
+        if parsed.kind == "next" and parsed.headsign:
+            headsign = match_route_headsign(conn, route, parsed.headsign)
+        if parsed.kind == "next" and (headsign or parsed.direction_id is not None):
+            page = next_departures(
+                conn,
+                stop.stop_id_padded,
+                date_str,
+                q_time,
+                route_short_name=route,
+                direction_id=parsed.direction_id,
+                headsign_like=headsign,
+                limit=5,
+            )
+            return format_response(
+                question,
+                {
+                "route": route,
+                "stop": stop.stop_name,
+                "date": date_str,
+                "time": q_time,
+                "departures": page["departures"],
+                "next_cursor": page["next_cursor"],
+                },
+            )
+
         # Next / closest with time
-        if q_time:
-            rows = next_departures_per_headsign(conn, route, stop.stop_id_padded, date_str, q_time)
+        if parsed.kind == "next":
+            time_str = bucket_time(q_time)
+            rows = SINGLE_FLIGHT.do(
+                ("next_departures_per_headsign", route, stop.stop_id_padded, date_str, time_str),
+                next_departures_per_headsign,
+                conn,
+                route,
+                stop.stop_id_padded,
+                date_str,
+                time_str,
+            )
             return format_response(
                 question,
                 {
@@ -389,7 +471,10 @@ def answer_question(question):
                 "stop": stop.stop_name,
                 "date": date_str,
                 "time": q_time,
-                "next_by_direction": [(r["departure_time"], r["trip_headsign"]) for r in rows],
+                "next_by_direction": [
+                    (r["predicted_departure_time"], r["trip_headsign"], r["delay_secs"])
+                    for r in rows
+                ],
                 },
             )
 
@@ -398,7 +483,8 @@ def answer_question(question):
             {"error": "Please include a time (e.g., 'around 7:30 am') or ask for first/last."},
         )
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
 
 
 def main():
@@ -415,11 +501,16 @@ def format_response(question, payload):
         if not payload["options"]:
             lines.append("No options found.")
         for i, it in enumerate(payload["options"], 1):
+            fare = ""
+            if it.get("fare") is not None:
+                fare = f" ({it['currency']} {it['fare']:.2f})"
+            stay = " (stay on board)" if it.get("interlined") else ""
             lines.append(
                 f"{i}) {it['first_route']} {it['first_headsign']} "
-                f"{it['first_depart']} -> {it['transfer_stop_name']} {it['transfer_arrive']}; "
+                f"{it['first_depart']} -> {it['transfer_stop_name']} {it['transfer_arrive']}"
+                f"{stay}; "
                 f"{it['second_route']} {it['second_headsign']} {it['second_depart']} -> "
-                f"{it['final_arrive']}"
+                f"{it['final_arrive']}{fare}"
             )
         return {"raw": payload, "response_text": "\\n".join(lines)}
 
@@ -437,13 +528,76 @@ def format_response(question, payload):
         )
         return {"raw": payload, "response_text": text}
 
+    if "headways" in payload:
+        where = f" at {payload['stop']}" if payload["stop"] else ""
+        when = f" around {payload['hour']:02d}:00" if payload["hour"] is not None else ""
+        lines = [f"How often route {payload['route']} runs{where} on {payload['date']}{when}:"]
+        if not payload["headways"]:
+            lines.append("No scheduled service found.")
+        for h in payload["headways"]:
+            headsign = ", ".join(h["headsigns"]) or f"direction {h['direction_id']}"
+            if h["median_headway_secs"] is None:
+                lines.append(f"- {headsign}: {h['departures']} departure(s) from {h['stop_name']}")
+                continue
+            lines.append(
+                f"- {headsign}: every {h['median_headway_secs'] // 60} min "
+                f"({h['min_headway_secs'] // 60}-{h['max_headway_secs'] // 60} min, "
+                f"{h['departures']} departures from {h['stop_name']})"
+            )
+        return {"raw": payload, "response_text": "\\n".join(lines)}
+
+    if "days" in payload:
+        where = f" at {payload['stop']}" if payload["stop"] else ""
+        lines = [
+            f"Service for route {payload['route']}{where}, "
+            f"{payload['start_date']} to {payload['end_date']}:"
+        ]
+        for d in payload["days"]:
+            if not d["trips"]:
+                line = f"- {d['weekday']} {d['date']}: no service"
+            else:
+                line = (
+                    f"- {d['weekday']} {d['date']}: {d['first_departure']}-"
+                    f"{d['last_departure']}, {d['trips']} trips"
+                )
+            if d["exceptions"]:
+                line += " (calendar exception)"
+            lines.append(line)
+        return {"raw": payload, "response_text": "\\n".join(lines)}
+
+    if "board" in payload:
+        lines = [
+            f"Departures from {payload['stop']} on {payload['date']} after "
+            f"{payload['time']}:"
+        ]
+        if not payload["board"]:
+            lines.append("No departures found.")
+        for d in payload["board"]:
+            lines.append(
+                f"- {d['departure_time']} route {d['route']} ({d['headsign']})"
+                f" at {d['stop_name']}"
+            )
+        return {"raw": payload, "response_text": "\\n".join(lines)}
+
+    if "departures" in payload and "next_cursor" in payload:
+        lines = [
+            f"Next departures for route {payload['route']} from {payload['stop']} on "
+            f"{payload['date']} after {payload['time']}:"
+        ]
+        if not payload["departures"]:
+            lines.append("No departures found.")
+        for d in payload["departures"]:
+            lines.append(f"- {d['departure_time']} ({d['headsign']})")
+        return {"raw": payload, "response_text": "\\n".join(lines)}
+
     if "next_by_direction" in payload:
         lines = [
             f"Next departures for route {payload['route']} from {payload['stop']} on "
             f"{payload['date']} after {payload['time']}:"
         ]
-        for t, headsign in payload["next_by_direction"]:
-            lines.append(f"- {t} ({headsign})")
+        for t, headsign, delay in payload["next_by_direction"]:
+            late = f", {round(delay / 60):+d} min" if delay else ""
+            lines.append(f"- {t} ({headsign}{late})")
         return {"raw": payload, "response_text": "\\n".join(lines)}
 
     return {"raw": payload, "response_text": str(payload)}
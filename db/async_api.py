@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import answering_layer
+import transfer_search
+from departures import next_departures
+from single_flight import SINGLE_FLIGHT
+from snapshots import SnapshotReader
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+DEFAULT_WORKERS = 4
+
+
+class AsyncQueryAPI:
+    """Async wrappers that run the blocking query functions on a dedicated pool.
+
+    Each worker thread owns one read-only connection to the current published
+    snapshot and moves to a newer snapshot on its next call after a rebuild.
+    `max_concurrency` caps in-flight queries (extra callers wait on the
+    semaphore instead of piling up in the executor queue) and `timeout` is the
+    default per-call deadline. When a call is cancelled or times out, the
+    worker's connection is interrupted so a running SQLite statement stops
+    instead of finishing in the background; a per-job lock keeps that
+    interrupt from reaching the next job on the same connection.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_concurrency=None, timeout=None):
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers
+        self.timeout = timeout
+        self._reader = SnapshotReader(DB_PATH)
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="gtfs-query"
+        )
+
+    def _conn(self):
+        return self._reader.connection()
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Run fn(conn, *args, **kwargs) on a worker with its own connection."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        timeout = self.timeout if timeout is None else timeout
+        state = {"conn": None, "cancelled": False}
+        # Held only to publish/clear the job's connection and to interrupt it,
+        # so the interrupt can only land while this job still owns it.
+        lock = threading.Lock()
+
+        def job():
+            conn = self._conn()
+            with lock:
+                if state["cancelled"]:
+                    return None
+                state["conn"] = conn
+            try:
+                return fn(conn, *args, **kwargs)
+            finally:
+                with lock:
+                    state["conn"] = None
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, job)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                with lock:
+                    state["cancelled"] = True
+                    if state["conn"] is not None:
+                        state["conn"].interrupt()
+                raise
+
+    async def answer_question(self, question, timeout=None):
+        return await self.run(
+            lambda conn: answering_layer.answer_question(question, conn=conn),
+            timeout=timeout,
+        )
+
+    async def search_fastest_one_transfer(
+        self, date, time, from_stop_id_padded, to_stop_id_padded, limit=3, timeout=None
+    ):
+        return await self.run(
+            lambda conn: transfer_search.search_fastest_one_transfer(
+                date, time, from_stop_id_padded, to_stop_id_padded, limit, conn=conn
+            ),
+            timeout=timeout,
+        )
+
+    async def next_departures(self, stop_id_padded, date_str, time_str, timeout=None, **kwargs):
+        return await self.run(
+            next_departures, stop_id_padded, date_str, time_str, timeout=timeout, **kwargs
+        )
+
+    def coalescing_metrics(self):
+        return SINGLE_FLIGHT.metrics()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._reader.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+async def _timed_batch(api, calls):
+    started = time.perf_counter()
+    await asyncio.gather(*(api.run(fn, *args) for fn, args in calls))
+    return time.perf_counter() - started
+
+
+def benchmark(calls, worker_counts=(1, 2, 4, 8), rounds=3):
+    """Run the same batch of independent calls at each worker count.
+
+    Returns {workers: (best_seconds, speedup_vs_1)}. sqlite3 releases the GIL
+    while a statement steps, so SQL-bound queries scale until workers exceed
+    the cores available.
+    """
+
+    async def measure(workers):
+        async with AsyncQueryAPI(workers=workers) as api:
+            await _timed_batch(api, calls[:workers])  # open the connections
+            return min([await _timed_batch(api, calls) for _ in range(rounds)])
+
+    results = {}
+    base = None
+    for workers in worker_counts:
+        elapsed = asyncio.run(measure(workers))
+        base = base or elapsed
+        results[workers] = (elapsed, base / elapsed)
+    return results
+
+
+def main():
+    calls = [
+        (next_departures, ("0001", "2026-01-28", f"{h:02d}:00:00"))
+        for h in range(6, 22)
+    ] * 4
+    for workers, (elapsed, speedup) in benchmark(calls).items():
+        print(f"{workers} workers: {elapsed * 1000:.1f} ms ({speedup:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,36 +2,53 @@ import csv
 import json
 import os
 import sqlite3
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from departures import STATION_RADIUS_M, distance_m
+from gtfs_time import time_to_secs
+from headways import build_headways
+from json_stream import iter_members
+from od_table import build_od_table
+from service_calendar import service_dates
+from snapshots import new_snapshot_path, publish_snapshot
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 GTFS_DIR = BASE_DIR / "RTSGTFS_Spring2026_V6"
 BUS_STOPS_JSON = BASE_DIR / "bus_stops" / "bus_stops_optimized.json"
 DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+MAX_LAYOVER_SECS = 30 * 60  # longer gaps are pull-ins/deadheads, not a ride
 
 
 GTFS_FILES = [
     "agency.txt",
     "calendar.txt",
     "calendar_dates.txt",
-    "fare_attributes.txt",
-    "fare_rules.txt",
     "feed_info.txt",
     "routes.txt",
-    "shapes.txt",
     "stops.txt",
     "stop_times.txt",
     "trips.txt",
 ]
+# Not needed to answer schedule questions; engine.py reads them from the DB when
+# present, otherwise straight from GTFS_DIR on first use. Set
+# RTS_BUILD_OPTIONAL=1 to load them into the database as well.
+OPTIONAL_GTFS_FILES = [
+    "fare_attributes.txt",
+    "fare_rules.txt",
+    "shapes.txt",
+]
 
 
 def ensure_db_dir():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
-def connect_db():
-    conn = sqlite3.connect(DB_PATH)
+def connect_db(path=None):
+    # Only ever used on a private, not-yet-published snapshot file, so skipping
+    # the journal cannot expose readers to a half-written database.
+    conn = sqlite3.connect(path or DB_PATH)
     conn.execute("PRAGMA journal_mode = OFF;")
     conn.execute("PRAGMA synchronous = OFF;")
     conn.execute("PRAGMA temp_store = MEMORY;")
@@ -42,8 +59,9 @@ def quoted(cols):
     return ", ".join([f'"{c}"' for c in cols])
 
 
-def create_table(cur, table, columns):
-    cols = ", ".join([f'"{c}" TEXT' for c in columns])
+def create_table(cur, table, columns, column_types=None):
+    column_types = column_types or {}
+    cols = ", ".join([f'"{c}" {column_types.get(c, "TEXT")}' for c in columns])
     cur.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols});')
 
 
@@ -54,12 +72,16 @@ def load_csv_table(conn, filepath):
         header = next(reader)
 
         extra_cols = []
+        column_types = {}
         if table == "stops":
             extra_cols = ["stop_id_padded"]
+        elif table == "stop_times":
+            extra_cols = ["arrival_secs", "departure_secs"]
+            column_types = {"arrival_secs": "INTEGER", "departure_secs": "INTEGER"}
 
         columns = header + extra_cols
         cur = conn.cursor()
-        create_table(cur, table, columns)
+        create_table(cur, table, columns, column_types)
 
         insert_cols = quoted(columns)
         placeholders = ", ".join(["?"] * len(columns))
@@ -82,6 +104,11 @@ def load_csv_table(conn, filepath):
                 else:
                     stop_id_padded = stop_id
                 row = row + [stop_id_padded]
+            elif table == "stop_times":
+                row = row + [
+                    time_to_secs(row[header.index("arrival_time")]),
+                    time_to_secs(row[header.index("departure_time")]),
+                ]
             batch.append(row)
             if len(batch) >= 5000:
                 cur.executemany(sql, batch)
@@ -90,45 +117,109 @@ def load_csv_table(conn, filepath):
             cur.executemany(sql, batch)
 
 
+BUS_STOP_COLUMNS = {
+    "stop_id_padded": "TEXT",
+    "stop_id_raw": "INTEGER",
+    "stop_name": "TEXT",
+    "street": "TEXT",
+    "crossroad": "TEXT",
+    "area": "TEXT",
+    "status": "TEXT",
+    "is_uf": "INTEGER",
+    "category": "TEXT",
+    "latitude": "REAL",
+    "longitude": "REAL",
+    "coords_valid": "INTEGER",
+    "shelters": "INTEGER",
+    "shelter_type": "TEXT",
+    "benches": "INTEGER",
+    "bench_type": "TEXT",
+    "trash_cans": "INTEGER",
+    "trash_can_type": "TEXT",
+    "lighting": "TEXT",
+    "bike_racks": "INTEGER",
+}
+
+
+def as_flag(value):
+    return None if value is None else int(bool(value))
+
+
+def bus_stop_row(s):
+    raw = s.get("stopId")
+    try:
+        raw_int = int(raw)
+        padded = f"{raw_int:04d}"
+    except (TypeError, ValueError):
+        raw_int = None
+        padded = ""
+    coords = s.get("coordinates") or {}
+    amenities = s.get("amenities") or {}
+    return (
+        padded,
+        raw_int,
+        s.get("stopName"),
+        s.get("street"),
+        s.get("crossroad"),
+        s.get("area") or None,
+        s.get("status") or None,
+        as_flag(s.get("isUF")),
+        s.get("category"),
+        coords.get("latitude"),
+        coords.get("longitude"),
+        as_flag(coords.get("isValid")),
+        amenities.get("shelters"),
+        amenities.get("shelterType"),
+        amenities.get("benches"),
+        amenities.get("benchType"),
+        amenities.get("trashCans"),
+        amenities.get("trashCanType"),
+        amenities.get("lighting"),
+        amenities.get("bikeRacks"),
+    )
+
+
+def flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, list):
+        out.append((prefix, json.dumps(value, ensure_ascii=False)))
+    else:
+        out.append((prefix, value))
+    return out
+
+
 def load_bus_stops(conn):
     if not BUS_STOPS_JSON.exists():
         return
-    with BUS_STOPS_JSON.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    stops = data.get("busStops", [])
-
     cur = conn.cursor()
+    columns = list(BUS_STOP_COLUMNS)
+    create_table(cur, "bus_stops", columns, BUS_STOP_COLUMNS)
     cur.execute(
-        "CREATE TABLE IF NOT EXISTS bus_stops ("
-        "stop_id_padded TEXT, "
-        "stop_id_raw INTEGER, "
-        "stop_name TEXT"
-        ");"
+        "CREATE TABLE IF NOT EXISTS bus_stops_metadata (key TEXT PRIMARY KEY, value);"
+    )
+    sql = (
+        f"INSERT INTO bus_stops ({quoted(columns)}) "
+        f"VALUES ({', '.join(['?'] * len(columns))});"
     )
 
+    # One streaming pass: stops are inserted in batches as they are parsed, so
+    # memory stays flat however large the inventory grows.
     batch = []
-    for s in stops:
-        raw = s.get("stopId")
-        try:
-            raw_int = int(raw)
-            padded = f"{raw_int:04d}"
-        except (TypeError, ValueError):
-            raw_int = None
-            padded = ""
-        batch.append((padded, raw_int, s.get("stopName")))
-        if len(batch) >= 5000:
+    for key, value in iter_members(BUS_STOPS_JSON, array_keys=("busStops",)):
+        if key == "metadata":
             cur.executemany(
-                "INSERT INTO bus_stops (stop_id_padded, stop_id_raw, stop_name) "
-                "VALUES (?, ?, ?);",
-                batch,
+                "INSERT INTO bus_stops_metadata (key, value) VALUES (?, ?);",
+                flatten("", value, []),
             )
-            batch = []
+        elif key == "busStops":
+            batch.append(bus_stop_row(value))
+            if len(batch) >= 5000:
+                cur.executemany(sql, batch)
+                batch = []
     if batch:
-        cur.executemany(
-            "INSERT INTO bus_stops (stop_id_padded, stop_id_raw, stop_name) "
-            "VALUES (?, ?, ?);",
-            batch,
-        )
+        cur.executemany(sql, batch)
 
 
 def create_indexes(conn):
@@ -143,7 +234,13 @@ def create_indexes(conn):
     cur.execute(
         'CREATE INDEX IF NOT EXISTS idx_stop_times_stop_id ON stop_times("stop_id");'
     )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stop_times_stop_departure "
+        "ON stop_times(stop_id, departure_secs, trip_id);"
+    )
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_trips_trip_id ON trips("trip_id");')
     cur.execute('CREATE INDEX IF NOT EXISTS idx_trips_route_id ON trips("route_id");')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_routes_route_id ON routes("route_id");')
     cur.execute(
         'CREATE INDEX IF NOT EXISTS idx_trips_service_id ON trips("service_id");'
     )
@@ -157,9 +254,39 @@ def create_indexes(conn):
     cur.execute(
         "CREATE INDEX IF NOT EXISTS idx_bus_stops_padded ON bus_stops(stop_id_padded);"
     )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bus_stops_status ON bus_stops(status);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bus_stops_area ON bus_stops(area);")
     cur.execute(
         "CREATE INDEX IF NOT EXISTS idx_fuzzy_lookup_norm ON fuzzy_lookup(normalized);"
     )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pattern_stops_stop_id "
+        "ON pattern_stops(stop_id, pattern_id);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pattern_stops_pattern "
+        "ON pattern_stops(pattern_id, stop_index);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_trip_patterns_pattern_id "
+        "ON trip_patterns(pattern_id);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_service_days_date "
+        "ON service_days(service_date, service_id, day_offset);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_route_stops_route "
+        "ON route_stops(route_short_name, stop_id_padded);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_route_stops_stop "
+        "ON route_stops(stop_id_padded, route_short_name);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_route_stops_stop_id "
+        "ON route_stops(stop_id, route_short_name);"
+    )
 
 
 def create_views(conn):
@@ -174,6 +301,24 @@ def create_views(conn):
         "FROM bus_stops b "
         "LEFT JOIN stops s ON s.stop_id_padded = b.stop_id_padded;"
     )
+    cur.execute(
+        "CREATE VIEW IF NOT EXISTS pattern_stop_times AS "
+        "SELECT tp.trip_id AS trip_id, "
+        "ps.stop_id AS stop_id, "
+        "ps.stop_sequence AS stop_sequence, "
+        "tp.start_secs + json_extract(tp.arrival_offsets, '$[' || ps.stop_index || ']') "
+        "AS arrival_secs, "
+        "tp.start_secs + json_extract(tp.departure_offsets, '$[' || ps.stop_index || ']') "
+        "AS departure_secs "
+        "FROM trip_patterns tp "
+        "JOIN pattern_stops ps ON ps.pattern_id = tp.pattern_id;"
+    )
+    cur.execute(
+        "CREATE VIEW IF NOT EXISTS stop_routes AS "
+        "SELECT stop_id_padded, stop_id, stop_name, route_id, route_short_name, "
+        "direction_id, first_stop_sequence, last_stop_sequence, trip_count, headsigns "
+        "FROM route_stops;"
+    )
     cur.execute(
         "CREATE VIEW IF NOT EXISTS calendar_service_days AS "
         "SELECT service_id, start_date, end_date, "
@@ -261,26 +406,345 @@ def create_fuzzy_lookup(conn):
         )
 
 
+def create_patterns(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS patterns ("
+        "pattern_id INTEGER PRIMARY KEY, "
+        "route_id TEXT, "
+        "direction_id TEXT, "
+        "stop_count INTEGER, "
+        "stop_ids TEXT"
+        ");"
+    )
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS pattern_stops ("
+        "pattern_id INTEGER, "
+        "stop_index INTEGER, "
+        "stop_id TEXT, "
+        "stop_sequence TEXT"
+        ");"
+    )
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS trip_patterns ("
+        "trip_id TEXT PRIMARY KEY, "
+        "pattern_id INTEGER, "
+        "start_secs INTEGER, "
+        "arrival_offsets TEXT, "
+        "departure_offsets TEXT"
+        ");"
+    )
+
+    trip_info = {
+        trip_id: (route_id, direction_id)
+        for trip_id, route_id, direction_id in conn.execute(
+            "SELECT trip_id, route_id, direction_id FROM trips;"
+        )
+    }
+
+    pattern_ids = {}
+    trip_batch = []
+
+    def flush_trip(trip_id, stops):
+        route_id, direction_id = trip_info.get(trip_id, (None, None))
+        key = (route_id, direction_id, tuple((s[0], s[1]) for s in stops))
+        pattern_id = pattern_ids.get(key)
+        if pattern_id is None:
+            pattern_id = len(pattern_ids) + 1
+            pattern_ids[key] = pattern_id
+            stop_ids = [s[0] for s in stops]
+            cur.execute(
+                "INSERT INTO patterns (pattern_id, route_id, direction_id, stop_count, stop_ids) "
+                "VALUES (?, ?, ?, ?, ?);",
+                (pattern_id, route_id, direction_id, len(stops), json.dumps(stop_ids)),
+            )
+            cur.executemany(
+                "INSERT INTO pattern_stops (pattern_id, stop_index, stop_id, stop_sequence) "
+                "VALUES (?, ?, ?, ?);",
+                [(pattern_id, i, s[0], s[1]) for i, s in enumerate(stops)],
+            )
+
+        start = next(
+            (t for s in stops for t in (s[2], s[3]) if t is not None), None
+        )
+        if start is None:
+            arrivals = [None] * len(stops)
+            departures = [None] * len(stops)
+        else:
+            arrivals = [None if s[2] is None else s[2] - start for s in stops]
+            departures = [None if s[3] is None else s[3] - start for s in stops]
+        trip_batch.append(
+            (trip_id, pattern_id, start, json.dumps(arrivals), json.dumps(departures))
+        )
+        if len(trip_batch) >= 5000:
+            cur.executemany(
+                "INSERT INTO trip_patterns "
+                "(trip_id, pattern_id, start_secs, arrival_offsets, departure_offsets) "
+                "VALUES (?, ?, ?, ?, ?);",
+                trip_batch,
+            )
+            trip_batch.clear()
+
+    current_trip = None
+    stops = []
+    for trip_id, stop_id, seq, arrival, departure in conn.execute(
+        "SELECT trip_id, stop_id, stop_sequence, arrival_time, departure_time "
+        "FROM stop_times ORDER BY trip_id, CAST(stop_sequence AS INTEGER);"
+    ):
+        if trip_id != current_trip:
+            if stops:
+                flush_trip(current_trip, stops)
+            current_trip = trip_id
+            stops = []
+        stops.append((stop_id, seq, time_to_secs(arrival), time_to_secs(departure)))
+    if stops:
+        flush_trip(current_trip, stops)
+
+    if trip_batch:
+        cur.executemany(
+            "INSERT INTO trip_patterns "
+            "(trip_id, pattern_id, start_secs, arrival_offsets, departure_offsets) "
+            "VALUES (?, ?, ?, ?, ?);",
+            trip_batch,
+        )
+
+
+def create_route_stops(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS route_stops ("
+        "route_id TEXT, "
+        "route_short_name TEXT, "
+        "direction_id TEXT, "
+        "stop_id TEXT, "
+        "stop_id_padded TEXT, "
+        "stop_name TEXT, "
+        "first_stop_sequence INTEGER, "
+        "last_stop_sequence INTEGER, "
+        "trip_count INTEGER, "
+        "headsigns TEXT"
+        ");"
+    )
+
+    pattern_headsigns = {}
+    pattern_trips = {}
+    for pattern_id, headsign, trips in conn.execute(
+        "SELECT tp.pattern_id, t.trip_headsign, COUNT(*) "
+        "FROM trip_patterns tp JOIN trips t ON t.trip_id = tp.trip_id "
+        "GROUP BY tp.pattern_id, t.trip_headsign;"
+    ):
+        if headsign:
+            pattern_headsigns.setdefault(pattern_id, set()).add(headsign)
+        pattern_trips[pattern_id] = pattern_trips.get(pattern_id, 0) + trips
+
+    adjacency = {}
+    for row in conn.execute(
+        "SELECT p.pattern_id, p.route_id, r.route_short_name, p.direction_id, "
+        "ps.stop_id, s.stop_id_padded, s.stop_name, ps.stop_sequence "
+        "FROM pattern_stops ps "
+        "JOIN patterns p ON p.pattern_id = ps.pattern_id "
+        "LEFT JOIN routes r ON r.route_id = p.route_id "
+        "LEFT JOIN stops s ON s.stop_id = ps.stop_id;"
+    ):
+        pattern_id, route_id, short_name, direction_id, stop_id, padded, name, seq = row
+        seq = int(seq) if seq and seq.isdigit() else None
+        key = (route_id, direction_id, stop_id)
+        entry = adjacency.get(key)
+        if entry is None:
+            entry = adjacency[key] = {
+                "row": (route_id, short_name, direction_id, stop_id, padded, name),
+                "first": seq,
+                "last": seq,
+                "patterns": set(),
+                "headsigns": set(),
+            }
+        if seq is not None:
+            entry["first"] = seq if entry["first"] is None else min(entry["first"], seq)
+            entry["last"] = seq if entry["last"] is None else max(entry["last"], seq)
+        entry["patterns"].add(pattern_id)
+        entry["headsigns"].update(pattern_headsigns.get(pattern_id, ()))
+
+    batch = []
+    for entry in adjacency.values():
+        trip_count = sum(pattern_trips.get(pid, 0) for pid in entry["patterns"])
+        batch.append(
+            entry["row"]
+            + (
+                entry["first"],
+                entry["last"],
+                trip_count,
+                json.dumps(sorted(entry["headsigns"])),
+            )
+        )
+    cur.executemany(
+        "INSERT INTO route_stops (route_id, route_short_name, direction_id, stop_id, "
+        "stop_id_padded, stop_name, first_stop_sequence, last_stop_sequence, "
+        "trip_count, headsigns) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+        batch,
+    )
+
+
+def create_block_links(conn):
+    """Link each trip to the trip its vehicle runs next under the same block_id.
+
+    A block's trips (per service_id) are ordered by start time and each is
+    linked to its successor when that starts no earlier than the trip ends,
+    within MAX_LAYOVER_SECS, at the trip's last stop or another stop within
+    STATION_RADIUS_M. Riders can stay on board across such a link.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS block_links ("
+        "trip_id TEXT PRIMARY KEY, "
+        "next_trip_id TEXT, "
+        "layover_secs INTEGER"
+        ");"
+    )
+    coords = {
+        stop_id: (lat, lon)
+        for stop_id, lat, lon in conn.execute(
+            "SELECT stop_id, CAST(stop_lat AS REAL), CAST(stop_lon AS REAL) FROM stops;"
+        )
+    }
+
+    blocks = {}
+    for trip_id, block_id, service_id, start, arrivals, stop_ids in conn.execute(
+        "SELECT t.trip_id, t.block_id, t.service_id, tp.start_secs, "
+        "tp.arrival_offsets, p.stop_ids "
+        "FROM trips t "
+        "JOIN trip_patterns tp ON tp.trip_id = t.trip_id "
+        "JOIN patterns p ON p.pattern_id = tp.pattern_id "
+        "WHERE t.block_id IS NOT NULL AND t.block_id != '' "
+        "AND tp.start_secs IS NOT NULL;"
+    ):
+        offsets = [a for a in json.loads(arrivals) if a is not None]
+        stop_ids = json.loads(stop_ids)
+        end = start + (offsets[-1] if offsets else 0)
+        blocks.setdefault((block_id, service_id), []).append(
+            (start, end, trip_id, stop_ids[0], stop_ids[-1])
+        )
+
+    batch = []
+    for trips in blocks.values():
+        trips.sort()
+        for trip, following in zip(trips, trips[1:]):
+            layover = following[0] - trip[1]
+            if not 0 <= layover <= MAX_LAYOVER_SECS:
+                continue
+            if trip[4] != following[3]:
+                here, there = coords.get(trip[4]), coords.get(following[3])
+                if None in (here, there) or None in here + there:
+                    continue
+                if distance_m(*here, *there) > STATION_RADIUS_M:
+                    continue
+            batch.append((trip[2], following[2], layover))
+    cur.executemany(
+        "INSERT INTO block_links (trip_id, next_trip_id, layover_secs) VALUES (?, ?, ?);",
+        batch,
+    )
+
+
+def create_service_days(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS service_days ("
+        "service_date TEXT, "
+        "service_id TEXT, "
+        "day_offset INTEGER"
+        ");"
+    )
+    late_services = {
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT t.service_id FROM stop_times st "
+            "JOIN trips t ON t.trip_id = st.trip_id "
+            "WHERE st.departure_secs >= 86400 OR st.arrival_secs >= 86400;"
+        )
+    }
+
+    # Trips past 24:00 belong to the previous service day; expose them on the
+    # next calendar date with a one-day offset on the same seconds timeline.
+    batch = []
+    for service_id, days in service_dates(conn).items():
+        for day in days:
+            batch.append((day, service_id, 0))
+            if service_id in late_services:
+                next_day = datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)
+                batch.append((next_day.strftime("%Y-%m-%d"), service_id, 86400))
+    cur.executemany(
+        "INSERT INTO service_days (service_date, service_id, day_offset) VALUES (?, ?, ?);",
+        batch,
+    )
+
+
+def create_service_bitsets(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS service_bitsets ("
+        "service_id TEXT PRIMARY KEY, "
+        "epoch_date TEXT, "
+        "day_count INTEGER, "
+        "bits TEXT"
+        ");"
+    )
+    dates = service_dates(conn)
+    all_days = [d for days in dates.values() for d in days]
+    if not all_days:
+        return
+    epoch = datetime.strptime(min(all_days), "%Y-%m-%d")
+    day_count = (datetime.strptime(max(all_days), "%Y-%m-%d") - epoch).days + 1
+
+    # bit i set = service runs on epoch_date + i days; stored as hex text since
+    # the mask is wider than SQLite's 64-bit integers.
+    batch = []
+    for service_id, days in dates.items():
+        bits = 0
+        for day in days:
+            bits |= 1 << (datetime.strptime(day, "%Y-%m-%d") - epoch).days
+        batch.append((service_id, epoch.strftime("%Y-%m-%d"), day_count, format(bits, "x")))
+    cur.executemany(
+        "INSERT INTO service_bitsets (service_id, epoch_date, day_count, bits) "
+        "VALUES (?, ?, ?, ?);",
+        batch,
+    )
+
+
 def main():
     ensure_db_dir()
     if not GTFS_DIR.exists():
         raise SystemExit(f"GTFS folder not found: {GTFS_DIR}")
-    if DB_PATH.exists():
-        DB_PATH.unlink()
-
-    conn = connect_db()
+    building = new_snapshot_path(DB_PATH)
+    conn = connect_db(building)
     try:
-        for name in GTFS_FILES:
+        names = GTFS_FILES
+        if os.environ.get("RTS_BUILD_OPTIONAL") == "1":
+            names = GTFS_FILES + OPTIONAL_GTFS_FILES
+        for name in names:
             path = GTFS_DIR / name
             if path.exists():
                 load_csv_table(conn, path)
         load_bus_stops(conn)
+        create_patterns(conn)
+        create_block_links(conn)
+        create_route_stops(conn)
+        create_service_days(conn)
+        create_service_bitsets(conn)
+        build_headways(conn)
         create_fuzzy_lookup(conn)
         create_indexes(conn)
+        build_od_table(conn)
         create_views(conn)
         conn.commit()
-    finally:
+        conn.execute("ANALYZE;")
+        conn.commit()
+    except BaseException:
         conn.close()
+        building.unlink(missing_ok=True)
+        raise
+    conn.close()
+    snapshot = publish_snapshot(building, DB_PATH)
+    print(f"Published {snapshot.name}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,345 @@
+import json
+import sqlite3
+import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+from gtfs_tables import table_exists
+from patterns import trip_stop_times
+from snapshots import PerSnapshotCache
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+NO_TIME = -1  # stands in for a NULL arrival/departure in the time arrays
+KEEP_CATALOGS = 2
+
+
+class StringPool:
+    """Stores each distinct string once and hands out small int ids for it.
+
+    Id 0 is reserved for None, so array columns of ids never need a sentinel.
+    """
+
+    __slots__ = ("strings", "_ids")
+
+    def __init__(self):
+        self.strings = [None]
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def add(self, text):
+        if text is None:
+            return 0
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[text] = string_id
+            self.strings.append(sys.intern(text))
+        return string_id
+
+
+class Catalog:
+    """The static timetable as dense int ids and flat typed arrays.
+
+    Stops, routes, services, trips and patterns each get ids 0..n-1 in
+    database order; `*_index` dicts map GTFS ids back to them. Per-row
+    attributes live in parallel array.array columns, and display strings
+    (names, headsigns, stop_sequence text) are pool ids, so a trip costs a
+    few machine words instead of a dict per stop time. Pattern stops are one
+    flat run per pattern (`pattern_first[p]:pattern_first[p + 1]`) and each
+    trip's absolute arrival/departure secs one equally long run starting at
+    `trip_first[t]`. `trip_next[t]` is the trip the same vehicle runs next
+    (block_links; -1 for none) and `trip_layover[t]` the wait before it.
+    """
+
+    __slots__ = (
+        "strings",
+        "stop_ids",
+        "stop_index",
+        "stop_padded",
+        "stop_name",
+        "stop_lat",
+        "stop_lon",
+        "route_ids",
+        "route_index",
+        "route_short_name",
+        "service_ids",
+        "service_index",
+        "trip_ids",
+        "trip_index",
+        "trip_route",
+        "trip_service",
+        "trip_headsign",
+        "trip_pattern",
+        "trip_first",
+        "trip_next",
+        "trip_layover",
+        "pattern_index",
+        "pattern_first",
+        "pattern_stop",
+        "pattern_seq",
+        "pattern_seq_text",
+        "arrivals",
+        "departures",
+    )
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.stop_ids = []
+        self.stop_index = {}
+        self.stop_padded = array("i")
+        self.stop_name = array("i")
+        self.stop_lat = array("d")
+        self.stop_lon = array("d")
+        self.route_ids = []
+        self.route_index = {}
+        self.route_short_name = array("i")
+        self.service_ids = []
+        self.service_index = {}
+        self.trip_ids = []
+        self.trip_index = {}
+        self.trip_route = array("i")
+        self.trip_service = array("i")
+        self.trip_headsign = array("i")
+        self.trip_pattern = array("i")
+        self.trip_first = array("i")
+        self.trip_next = array("i")
+        self.trip_layover = array("i")
+        self.pattern_index = {}
+        self.pattern_first = array("i", [0])
+        self.pattern_stop = array("i")
+        self.pattern_seq = array("i")
+        self.pattern_seq_text = array("i")
+        self.arrivals = array("i")
+        self.departures = array("i")
+
+    @classmethod
+    def load(cls, conn):
+        catalog = cls()
+        catalog._load_stops(conn)
+        catalog._load_routes(conn)
+        catalog._load_patterns(conn)
+        catalog._load_trips(conn)
+        catalog._load_block_links(conn)
+        return catalog
+
+    def _load_stops(self, conn):
+        add = self.strings.add
+        for stop_id, padded, name, lat, lon in conn.execute(
+            "SELECT stop_id, stop_id_padded, stop_name, CAST(stop_lat AS REAL), "
+            "CAST(stop_lon AS REAL) FROM stops ORDER BY rowid;"
+        ):
+            self.stop_index[stop_id] = len(self.stop_ids)
+            self.stop_ids.append(self.strings[add(stop_id)])
+            self.stop_padded.append(add(padded))
+            self.stop_name.append(add(name))
+            self.stop_lat.append(float("nan") if lat is None else lat)
+            self.stop_lon.append(float("nan") if lon is None else lon)
+
+    def _load_routes(self, conn):
+        for route_id, short_name in conn.execute(
+            "SELECT route_id, route_short_name FROM routes ORDER BY rowid;"
+        ):
+            self.route_index[route_id] = len(self.route_ids)
+            self.route_ids.append(self.strings[self.strings.add(route_id)])
+            self.route_short_name.append(self.strings.add(short_name))
+
+    def _load_patterns(self, conn):
+        add = self.strings.add
+        current = None
+        for pattern_id, stop_id, seq in conn.execute(
+            "SELECT pattern_id, stop_id, stop_sequence FROM pattern_stops "
+            "ORDER BY pattern_id, stop_index;"
+        ):
+            if pattern_id != current:
+                if current is not None:
+                    self.pattern_first.append(len(self.pattern_stop))
+                self.pattern_index[pattern_id] = len(self.pattern_index)
+                current = pattern_id
+            self.pattern_stop.append(self.stop_index.get(stop_id, -1))
+            self.pattern_seq.append(int(seq))
+            self.pattern_seq_text.append(add(seq))
+        if current is not None:
+            self.pattern_first.append(len(self.pattern_stop))
+
+    def _load_trips(self, conn):
+        add = self.strings.add
+        timings = {
+            trip_id: (pattern_id, start, arrivals, departures)
+            for trip_id, pattern_id, start, arrivals, departures in conn.execute(
+                "SELECT trip_id, pattern_id, start_secs, arrival_offsets, "
+                "departure_offsets FROM trip_patterns;"
+            )
+        }
+        for trip_id, route_id, service_id, headsign in conn.execute(
+            "SELECT trip_id, route_id, service_id, trip_headsign FROM trips ORDER BY rowid;"
+        ):
+            if service_id not in self.service_index:
+                self.service_index[service_id] = len(self.service_ids)
+                self.service_ids.append(self.strings[add(service_id)])
+            self.trip_index[trip_id] = len(self.trip_ids)
+            self.trip_ids.append(self.strings[add(trip_id)])
+            self.trip_route.append(self.route_index.get(route_id, -1))
+            self.trip_service.append(self.service_index[service_id])
+            self.trip_headsign.append(add(headsign))
+            self.trip_first.append(len(self.arrivals))
+
+            timing = timings.get(trip_id)
+            pattern = -1 if timing is None else self.pattern_index.get(timing[0], -1)
+            self.trip_pattern.append(pattern)
+            if pattern < 0:
+                continue
+            start = timing[1]
+            for offsets, column in ((timing[2], self.arrivals), (timing[3], self.departures)):
+                column.extend(
+                    NO_TIME if off is None or start is None else start + off
+                    for off in json.loads(offsets)
+                )
+
+    def _load_block_links(self, conn):
+        self.trip_next = array("i", [-1]) * len(self.trip_ids)
+        self.trip_layover = array("i", [0]) * len(self.trip_ids)
+        if not table_exists(conn, "block_links"):
+            return
+        for trip_id, next_trip_id, layover in conn.execute(
+            "SELECT trip_id, next_trip_id, layover_secs FROM block_links;"
+        ):
+            trip = self.trip_index.get(trip_id)
+            following = self.trip_index.get(next_trip_id)
+            if trip is not None and following is not None:
+                self.trip_next[trip] = following
+                self.trip_layover[trip] = layover
+
+    def stop_name_of(self, stop_id):
+        stop = self.stop_index.get(stop_id)
+        return stop_id if stop is None else self.strings[self.stop_name[stop]]
+
+    def route_short_name_of(self, trip):
+        route = self.trip_route[trip]
+        return None if route < 0 else self.strings[self.route_short_name[route]]
+
+    def headsign_of(self, trip):
+        return self.strings[self.trip_headsign[trip]]
+
+    def downstream(self, trip, after_stop_sequence):
+        """(stop_id, arrival_secs, stop_sequence) for each stop the trip
+        reaches after after_stop_sequence; arrival_secs is None when unset."""
+        pattern = self.trip_pattern[trip]
+        if pattern < 0:
+            return []
+        first = self.pattern_first[pattern]
+        last = self.pattern_first[pattern + 1]
+        start = bisect_right(self.pattern_seq, int(after_stop_sequence), first, last)
+        shift = self.trip_first[trip] - first
+        stop_ids, strings = self.stop_ids, self.strings.strings
+        pattern_stop, seq_text, arrivals = self.pattern_stop, self.pattern_seq_text, self.arrivals
+        result = []
+        for k in range(start, last):
+            arrival = arrivals[shift + k]
+            result.append(
+                (
+                    stop_ids[pattern_stop[k]],
+                    None if arrival == NO_TIME else arrival,
+                    strings[seq_text[k]],
+                )
+            )
+        return result
+
+    def interline(self, trip, to_stop_id):
+        """Staying aboard from trip into the next trip of its block to reach
+        to_stop_id, or None when the block continues elsewhere (or not at all).
+
+        Returns (alight_stop_id, alight_arrival, alight_seq, next_trip,
+        board_seq, board_departure, final_arrival, final_seq): where trip
+        ends, where the next trip starts and where it reaches to_stop_id.
+        """
+        following = self.trip_next[trip]
+        if following < 0:
+            return None
+        pattern, next_pattern = self.trip_pattern[trip], self.trip_pattern[following]
+        if pattern < 0 or next_pattern < 0:
+            return None
+        last = self.pattern_first[pattern + 1] - 1
+        first = self.pattern_first[next_pattern]
+        end = self.pattern_first[next_pattern + 1]
+        alight_arrival = self.arrivals[self.trip_first[trip] + last - self.pattern_first[pattern]]
+        board_departure = self.departures[self.trip_first[following]]
+        if alight_arrival == NO_TIME or board_departure == NO_TIME:
+            return None
+        to_stop = self.stop_index.get(to_stop_id)
+        if to_stop is None or self.pattern_stop[last] == to_stop:
+            return None
+        for k in range(first + 1, end):
+            if self.pattern_stop[k] != to_stop:
+                continue
+            final_arrival = self.arrivals[self.trip_first[following] + k - first]
+            if final_arrival == NO_TIME:
+                return None
+            strings = self.strings.strings
+            return (
+                self.stop_ids[self.pattern_stop[last]],
+                alight_arrival,
+                strings[self.pattern_seq_text[last]],
+                following,
+                strings[self.pattern_seq_text[first]],
+                board_departure,
+                final_arrival,
+                strings[self.pattern_seq_text[k]],
+            )
+        return None
+
+
+_CATALOGS = PerSnapshotCache(KEEP_CATALOGS)
+
+
+def catalog_for(conn):
+    """Catalog of the database behind conn, loaded once per file."""
+    return _CATALOGS.get(conn, Catalog.load)
+
+
+def traced(fn):
+    """(result, bytes still allocated, peak bytes) for fn()."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        started = time.perf_counter()
+        catalog, catalog_bytes, _ = traced(lambda: Catalog.load(conn))
+        load_secs = time.perf_counter() - started
+        trip_ids = [r[0] for r in conn.execute("SELECT trip_id FROM trip_patterns;")]
+        pattern_cache = {}
+        _, dict_bytes, _ = traced(
+            lambda: {t: trip_stop_times(conn, t, pattern_cache) for t in trip_ids}
+        )
+    finally:
+        conn.close()
+    print(
+        f"{len(catalog.stop_ids)} stops, {len(catalog.route_ids)} routes, "
+        f"{len(catalog.service_ids)} services, {len(catalog.trip_ids)} trips, "
+        f"{len(catalog.arrivals)} stop times, {len(catalog.strings)} distinct strings"
+    )
+    print(f"catalog:         {catalog_bytes / 1e6:6.2f} MB (loaded in {load_secs:.2f}s)")
+    print(f"stop_time dicts: {dict_bytes / 1e6:6.2f} MB")
+    print(f"ratio:           {dict_bytes / max(catalog_bytes, 1):6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import heapq
+import math
+from itertools import islice
+from pathlib import Path
+
+from gtfs_time import secs_to_clock, time_to_secs
+from service_calendar import service_day_offsets
+from snapshots import connect_snapshot, current_snapshot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+STATION_RADIUS_M = 150
+
+
+def connect_db():
+    return connect_snapshot(current_snapshot(DB_PATH))
+
+
+def encode_cursor(dep_secs, trip_id):
+    return f"{dep_secs}:{trip_id}"
+
+
+def decode_cursor(cursor):
+    secs, _, trip_id = cursor.partition(":")
+    return int(secs), trip_id
+
+
+def next_departures(
+    conn,
+    stop_id_padded,
+    date_str,
+    time_str,
+    route_short_name=None,
+    direction_id=None,
+    headsign_like=None,
+    limit=10,
+    cursor=None,
+):
+    if cursor:
+        after_secs, after_trip = decode_cursor(cursor)
+    else:
+        after_secs, after_trip = time_to_secs(time_str) or 0, ""
+
+    sql = """
+    SELECT st.departure_secs - sd.day_offset AS dep_secs, st.trip_id,
+           r.route_short_name, t.trip_headsign, t.direction_id
+    FROM stops s
+    JOIN stop_times st ON st.stop_id = s.stop_id
+    JOIN trips t ON t.trip_id = st.trip_id
+    JOIN routes r ON r.route_id = t.route_id
+    JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
+    WHERE s.stop_id_padded = :stop_id
+      AND st.departure_secs >= :after_secs + sd.day_offset
+      AND (st.departure_secs > :after_secs + sd.day_offset OR st.trip_id > :after_trip)
+      AND (:route IS NULL OR r.route_short_name = :route)
+      AND (:direction_id IS NULL OR t.direction_id = :direction_id)
+      AND (:headsign_like IS NULL OR t.trip_headsign LIKE :headsign_like)
+    ORDER BY dep_secs, st.trip_id
+    LIMIT :limit;
+    """
+    params = {"date": date_str}
+    params.update(
+        {
+            "stop_id": stop_id_padded,
+            "after_secs": after_secs,
+            "after_trip": after_trip,
+            "route": route_short_name,
+            "direction_id": None if direction_id is None else str(direction_id),
+            "headsign_like": headsign_like,
+            "limit": limit + 1,
+        }
+    )
+    rows = conn.execute(sql, params).fetchall()
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last["dep_secs"], last["trip_id"])
+    return {
+        "departures": [
+            {
+                "departure_time": secs_to_clock(r["dep_secs"]),
+                "departure_secs": r["dep_secs"],
+                "trip_id": r["trip_id"],
+                "route": r["route_short_name"],
+                "headsign": r["trip_headsign"],
+                "direction_id": r["direction_id"],
+            }
+            for r in page
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + (
+        math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(dlon / 2) ** 2
+    )
+    return 6371000 * 2 * math.asin(math.sqrt(a))
+
+
+def station_stops(conn, stop_id_padded, radius_m=None):
+    anchor = conn.execute(
+        "SELECT stop_id, stop_name, CAST(stop_lat AS REAL), CAST(stop_lon AS REAL) "
+        "FROM stops WHERE stop_id_padded = ?;",
+        (stop_id_padded,),
+    ).fetchone()
+    if not anchor:
+        return []
+    if not radius_m:
+        return [(anchor[0], anchor[1])]
+
+    lat, lon = anchor[2], anchor[3]
+    dlat = radius_m / 111320
+    dlon = radius_m / (111320 * max(math.cos(math.radians(lat)), 0.01))
+    rows = conn.execute(
+        "SELECT stop_id, stop_name, CAST(stop_lat AS REAL), CAST(stop_lon AS REAL) "
+        "FROM stops "
+        "WHERE CAST(stop_lat AS REAL) BETWEEN ? AND ? "
+        "AND CAST(stop_lon AS REAL) BETWEEN ? AND ?;",
+        (lat - dlat, lat + dlat, lon - dlon, lon + dlon),
+    ).fetchall()
+    nearby = sorted((distance_m(lat, lon, r[2], r[3]), r[0], r[1]) for r in rows)
+    return [(stop_id, name) for dist, stop_id, name in nearby if dist <= radius_m]
+
+
+def route_departures(
+    conn, stop_id, stop_name, route_id, service_ids, day_offset, after_secs
+):
+    placeholders = ",".join("?" for _ in service_ids)
+    cur = conn.execute(
+        f"""
+        SELECT st.departure_secs - ?, st.trip_id,
+               r.route_short_name, t.trip_headsign, t.direction_id
+        FROM stop_times st
+        JOIN trips t ON t.trip_id = st.trip_id
+        JOIN routes r ON r.route_id = t.route_id
+        WHERE st.stop_id = ?
+          AND st.departure_secs >= ?
+          AND t.route_id = ?
+          AND t.service_id IN ({placeholders})
+        ORDER BY st.departure_secs, st.trip_id;
+        """,
+        [day_offset, stop_id, after_secs + day_offset, route_id] + list(service_ids),
+    )
+    for row in cur:
+        yield (row[0], row[1], row[2], row[3], row[4], stop_id, stop_name)
+
+
+def departure_board(conn, stop_id_padded, date_str, time_str, limit=10, radius_m=None):
+    stops = station_stops(conn, stop_id_padded, radius_m)
+    offsets = service_day_offsets(conn, date_str)
+    if not stops or not offsets:
+        return {"stops": [name for _, name in stops], "departures": []}
+
+    after_secs = time_to_secs(time_str) or 0
+    placeholders = ",".join("?" for _ in stops)
+    pairs = conn.execute(
+        f"SELECT DISTINCT stop_id, route_id FROM route_stops "
+        f"WHERE stop_id IN ({placeholders});",
+        [stop_id for stop_id, _ in stops],
+    ).fetchall()
+    names = dict(stops)
+
+    # Each (stop, route, service day) cursor is already sorted by departure;
+    # heapq.merge keeps one pending row per cursor and stops reading once the
+    # board is full. Previous-day streams only exist for services running past
+    # midnight.
+    streams = [
+        route_departures(
+            conn, stop_id, names[stop_id], route_id, service_ids, day_offset, after_secs
+        )
+        for stop_id, route_id in pairs
+        for day_offset, service_ids in offsets.items()
+    ]
+    merged = heapq.merge(*streams, key=lambda d: (d[0], d[1]))
+    return {
+        "stops": [name for _, name in stops],
+        "departures": [
+            {
+                "departure_time": secs_to_clock(d[0]),
+                "departure_secs": d[0],
+                "trip_id": d[1],
+                "route": d[2],
+                "headsign": d[3],
+                "direction_id": d[4],
+                "stop_id": d[5],
+                "stop_name": d[6],
+            }
+            for d in islice(merged, limit)
+        ],
+    }
+
+
+def main():
+    conn = connect_db()
+    try:
+        cursor = None
+        for _ in range(2):
+            page = next_departures(
+                conn,
+                "0001",
+                "2026-01-28",
+                "14:30:00",
+                route_short_name="5",
+                limit=5,
+                cursor=cursor,
+            )
+            for d in page["departures"]:
+                print(f"{d['departure_time']} {d['route']} {d['headsign']}")
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+            print(f"-- next page ({cursor})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
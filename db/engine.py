@@ -0,0 +1,205 @@
+import math
+import time
+from pathlib import Path
+
+from catalog import catalog_for
+from departures import distance_m
+from fares import compile_fares
+from gtfs_tables import optional_rows
+from snapshots import connect_snapshot, current_snapshot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GTFS_DIR = BASE_DIR / "RTSGTFS_Spring2026_V6"
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+GRID_DEG = 0.005  # about 550 m of latitude per spatial index cell
+
+
+def normalize_text(text):
+    if text is None:
+        return ""
+    cleaned = []
+    for ch in text.lower().strip():
+        if ch.isalnum() or ch.isspace():
+            cleaned.append(ch)
+        else:
+            cleaned.append(" ")
+    return " ".join("".join(cleaned).split())
+
+
+class ScheduleEngine:
+    """Schedule lookups over the SQLite database with lazily built components.
+
+    Opening the engine only opens the database. Everything else (shapes, fares,
+    the headsign lookup, the stop spatial index, the timetable catalog) is
+    registered as a component and built, then memoized, the first time a query
+    asks for it. `timings` records how long the open and each component took
+    and which call first needed it; `startup_report()` formats them.
+
+    An engine is single-threaded: its connection is bound to the thread that
+    opened it and components are built without locking. Give each thread its
+    own engine.
+    """
+
+    def __init__(self, db_path=None, gtfs_dir=None):
+        self.db_path = Path(db_path or DB_PATH)
+        self.gtfs_dir = Path(gtfs_dir or GTFS_DIR)
+        self.started = time.perf_counter()
+        self.timings = []
+        self._builders = {}
+        self._values = {}
+
+        started = time.perf_counter()
+        self.conn = connect_snapshot(current_snapshot(self.db_path))
+        self._record("connect", started, "open")
+
+        self.register("shapes", build_shapes)
+        self.register("fares", build_fares)
+        self.register("headsign_lookup", build_headsign_lookup)
+        self.register("spatial_index", build_spatial_index)
+        self.register("catalog", build_catalog)
+
+    def _record(self, name, started, trigger):
+        now = time.perf_counter()
+        self.timings.append(
+            {
+                "component": name,
+                "seconds": now - started,
+                "at": started - self.started,
+                "trigger": trigger,
+            }
+        )
+
+    def register(self, name, builder):
+        """Register builder(engine) -> value, built on first get(name)."""
+        self._builders[name] = builder
+        self._values.pop(name, None)
+
+    def loaded(self, name):
+        return name in self._values
+
+    def get(self, name, trigger=None):
+        if name not in self._values:
+            started = time.perf_counter()
+            self._values[name] = self._builders[name](self)
+            self._record(name, started, trigger or name)
+        return self._values[name]
+
+    def rows(self, table):
+        return optional_rows(self.conn, table, self.gtfs_dir)
+
+    def shape(self, shape_id):
+        return self.get("shapes", "shape").get(shape_id, [])
+
+    def fare_for_route(self, route_id):
+        return self.get("fares", "fare_for_route").by_route_id.get(str(route_id))
+
+    def match_headsign(self, text):
+        norm = normalize_text(text)
+        if not norm:
+            return []
+        lookup = self.get("headsign_lookup", "match_headsign")
+        if norm in lookup:
+            return lookup[norm]
+        return sorted({h for key, names in lookup.items() if norm in key for h in names})
+
+    def nearest_stops(self, lat, lon, radius_m=150, limit=10):
+        grid = self.get("spatial_index", "nearest_stops")
+        # a degree of longitude shrinks with cos(latitude), so it needs more cells
+        reach_lat = int(radius_m / (111320 * GRID_DEG)) + 1
+        reach_lon = int(radius_m / (111320 * math.cos(math.radians(lat)) * GRID_DEG)) + 1
+        cell_lat = math.floor(lat / GRID_DEG)
+        cell_lon = math.floor(lon / GRID_DEG)
+        found = []
+        for i in range(cell_lat - reach_lat, cell_lat + reach_lat + 1):
+            for j in range(cell_lon - reach_lon, cell_lon + reach_lon + 1):
+                for stop in grid.get((i, j), ()):
+                    dist = distance_m(lat, lon, stop[2], stop[3])
+                    if dist <= radius_m:
+                        found.append((dist, stop[0], stop[1]))
+        found.sort()
+        return [
+            {"stop_id_padded": stop_id, "stop_name": name, "distance_m": round(dist)}
+            for dist, stop_id, name in found[:limit]
+        ]
+
+    def startup_report(self):
+        lines = []
+        for t in self.timings:
+            lines.append(
+                f"{t['component']:<16} {t['seconds'] * 1000:8.1f} ms "
+                f"(at +{t['at'] * 1000:.1f} ms, {t['trigger']})"
+            )
+        pending = sorted(set(self._builders) - set(self._values))
+        if pending:
+            lines.append(f"not loaded: {', '.join(pending)}")
+        return "\n".join(lines)
+
+    def close(self):
+        self.conn.close()
+
+
+def build_shapes(engine):
+    shapes = {}
+    for row in engine.rows("shapes"):
+        try:
+            point = (
+                int(row["shape_pt_sequence"]),
+                float(row["shape_pt_lat"]),
+                float(row["shape_pt_lon"]),
+            )
+        except (KeyError, ValueError):
+            continue
+        shapes.setdefault(row["shape_id"], []).append(point)
+    return {
+        shape_id: [(lat, lon) for _, lat, lon in sorted(points)]
+        for shape_id, points in shapes.items()
+    }
+
+
+def build_fares(engine):
+    return compile_fares(
+        engine.rows("fare_attributes"),
+        engine.rows("fare_rules"),
+        engine.conn.execute("SELECT route_id, route_short_name FROM routes;"),
+    )
+
+
+def build_headsign_lookup(engine):
+    lookup = {}
+    for (headsign,) in engine.conn.execute(
+        "SELECT DISTINCT trip_headsign FROM trips WHERE trip_headsign IS NOT NULL;"
+    ):
+        lookup.setdefault(normalize_text(headsign), []).append(headsign)
+    return lookup
+
+
+def build_spatial_index(engine):
+    grid = {}
+    for stop_id_padded, name, lat, lon in engine.conn.execute(
+        "SELECT stop_id_padded, stop_name, CAST(stop_lat AS REAL), "
+        "CAST(stop_lon AS REAL) FROM stops;"
+    ):
+        if lat is None or lon is None:
+            continue
+        cell = (math.floor(lat / GRID_DEG), math.floor(lon / GRID_DEG))
+        grid.setdefault(cell, []).append((stop_id_padded, name, lat, lon))
+    return grid
+
+
+def build_catalog(engine):
+    return catalog_for(engine.conn)
+
+
+def main():
+    engine = ScheduleEngine()
+    try:
+        print(engine.nearest_stops(29.6516, -82.3248, radius_m=300))
+        print(engine.match_headsign("downtown"))
+        print(engine.startup_report())
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import csv
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from engine import ScheduleEngine, normalize_text
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+OUT_PATH = BASE_DIR / "db" / "stop_match_suggestions.csv"
+RADIUS_M = 250
+TOP_N = 3
+NAME_WEIGHT = 0.7  # the rest of the score rewards proximity
+
+
+def name_similarity(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def suggestions_for(engine, stop, matched_gtfs, by_name):
+    name = normalize_text(stop["stop_name"])
+    candidates = {}
+    if stop["latitude"] is not None and stop["longitude"] is not None and stop["coords_valid"]:
+        for c in engine.nearest_stops(
+            stop["latitude"], stop["longitude"], radius_m=RADIUS_M, limit=50
+        ):
+            sim = name_similarity(name, normalize_text(c["stop_name"]))
+            proximity = 1 - c["distance_m"] / RADIUS_M
+            score = NAME_WEIGHT * sim + (1 - NAME_WEIGHT) * proximity
+            candidates[c["stop_id_padded"]] = (score, sim, c["distance_m"], c["stop_name"])
+    # Same normalized name anywhere in the feed (also covers bad coordinates)
+    for gtfs_padded, gtfs_name in by_name.get(name, []):
+        if gtfs_padded not in candidates:
+            candidates[gtfs_padded] = (NAME_WEIGHT, 1.0, None, gtfs_name)
+
+    ranked = sorted(candidates.items(), key=lambda kv: -kv[1][0])[:TOP_N]
+    return [
+        (
+            stop["stop_id_padded"],
+            stop["stop_id_raw"],
+            stop["stop_name"],
+            rank,
+            gtfs_padded,
+            gtfs_name,
+            distance,
+            round(sim, 3),
+            round(score, 3),
+            int(gtfs_padded in matched_gtfs),
+        )
+        for rank, (gtfs_padded, (score, sim, distance, gtfs_name)) in enumerate(ranked, 1)
+    ]
+
+
+def reconcile(engine):
+    conn = engine.conn
+    unmatched = conn.execute(
+        "SELECT b.stop_id_padded, b.stop_id_raw, b.stop_name, b.latitude, "
+        "b.longitude, b.coords_valid "
+        "FROM bus_stops b "
+        "LEFT JOIN stops s ON s.stop_id_padded = b.stop_id_padded "
+        "WHERE s.stop_id IS NULL "
+        "ORDER BY b.stop_id_padded;"
+    ).fetchall()
+    matched_gtfs = {
+        r[0]
+        for r in conn.execute(
+            "SELECT s.stop_id_padded FROM stops s "
+            "JOIN bus_stops b ON b.stop_id_padded = s.stop_id_padded;"
+        )
+    }
+    by_name = {}
+    for stop_id_padded, stop_name in conn.execute(
+        "SELECT stop_id_padded, stop_name FROM stops;"
+    ):
+        by_name.setdefault(normalize_text(stop_name), []).append((stop_id_padded, stop_name))
+
+    rows = []
+    for stop in unmatched:
+        rows.extend(suggestions_for(engine, stop, matched_gtfs, by_name))
+    return len(unmatched), rows
+
+
+def main():
+    if not DB_PATH.exists():
+        raise SystemExit(f"DB not found: {DB_PATH}")
+    started = time.perf_counter()
+    engine = ScheduleEngine(DB_PATH)
+    try:
+        total, rows = reconcile(engine)
+    finally:
+        engine.close()
+    with OUT_PATH.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "stop_id_padded",
+                "stop_id_raw",
+                "bus_stop_name",
+                "rank",
+                "gtfs_stop_id_padded",
+                "gtfs_stop_name",
+                "distance_m",
+                "name_similarity",
+                "score",
+                "gtfs_already_matched",
+            ]
+        )
+        writer.writerows(rows)
+    with_suggestion = len({r[0] for r in rows})
+    print(
+        f"{with_suggestion}/{total} unmatched stops have suggestions "
+        f"({time.perf_counter() - started:.2f}s) -> {OUT_PATH}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import csv
+import gzip
+import re
+import sqlite3
+from pathlib import Path
+
+from gtfs_time import time_to_secs
+from service_calendar import service_dates
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+OUT_DIR = BASE_DIR / "db" / "exports" / "timetable"
+CHUNK_ROWS = 50000
+
+
+COLUMNS = [
+    "service_id",
+    "trip_id",
+    "route_id",
+    "route_short_name",
+    "direction_id",
+    "trip_headsign",
+    "block_id",
+    "stop_id",
+    "stop_sequence",
+    "arrival_secs",
+    "departure_secs",
+    "service_day_count",
+    "first_service_date",
+    "last_service_date",
+]
+
+
+def partition_dir(service_id):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", service_id or "")
+    return OUT_DIR / f"service_id={safe}"
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_chunks(conn, service_id, days):
+    first = days[0] if days else None
+    last = days[-1] if days else None
+    cur = conn.execute(
+        """
+        SELECT t.service_id, st.trip_id, t.route_id, r.route_short_name,
+               t.direction_id, t.trip_headsign, t.block_id, st.stop_id,
+               st.stop_sequence, st.arrival_time, st.departure_time
+        FROM trips t
+        JOIN stop_times st ON st.trip_id = t.trip_id
+        LEFT JOIN routes r ON r.route_id = t.route_id
+        WHERE t.service_id = ?
+        ORDER BY st.trip_id, CAST(st.stop_sequence AS INTEGER);
+        """,
+        (service_id,),
+    )
+    while True:
+        rows = cur.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        yield [
+            (
+                r[0],
+                r[1],
+                r[2],
+                r[3],
+                to_int(r[4]),
+                r[5],
+                r[6],
+                r[7],
+                to_int(r[8]),
+                time_to_secs(r[9]),
+                time_to_secs(r[10]),
+                len(days),
+                first,
+                last,
+            )
+            for r in rows
+        ]
+
+
+def write_parquet(out, service_id, days, chunks):
+    schema = pa.schema(
+        [
+            ("service_id", pa.string()),
+            ("trip_id", pa.string()),
+            ("route_id", pa.string()),
+            ("route_short_name", pa.string()),
+            ("direction_id", pa.int8()),
+            ("trip_headsign", pa.string()),
+            ("block_id", pa.string()),
+            ("stop_id", pa.string()),
+            ("stop_sequence", pa.int32()),
+            ("arrival_secs", pa.int32()),
+            ("departure_secs", pa.int32()),
+            ("service_day_count", pa.int32()),
+            ("first_service_date", pa.string()),
+            ("last_service_date", pa.string()),
+        ]
+    )
+    rows_written = 0
+    with pq.ParquetWriter(out / "stop_times.parquet", schema, compression="zstd") as writer:
+        for chunk in chunks:
+            arrays = [
+                pa.array(col, type=field.type)
+                for col, field in zip(zip(*chunk), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(chunk)
+    pq.write_table(
+        pa.table({"service_id": [service_id] * len(days), "service_date": days}),
+        out / "service_dates.parquet",
+        compression="zstd",
+    )
+    return rows_written
+
+
+def write_csv(out, service_id, days, chunks):
+    rows_written = 0
+    for i, chunk in enumerate(chunks):
+        path = out / f"stop_times-{i:05d}.csv.gz"
+        with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(chunk)
+        rows_written += len(chunk)
+    with gzip.open(out / "service_dates.csv.gz", "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["service_id", "service_date"])
+        writer.writerows((service_id, d) for d in days)
+    return rows_written
+
+
+def main():
+    if not DB_PATH.exists():
+        raise SystemExit(f"DB not found: {DB_PATH}")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        dates = service_dates(conn)
+        service_ids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT DISTINCT service_id FROM trips ORDER BY service_id;"
+            )
+        ]
+        fmt = "parquet" if pq is not None else "csv.gz"
+        for service_id in service_ids:
+            days = dates.get(service_id, [])
+            out = partition_dir(service_id)
+            out.mkdir(parents=True, exist_ok=True)
+            for old in out.iterdir():
+                old.unlink()
+            chunks = iter_chunks(conn, service_id, days)
+            if pq is not None:
+                rows = write_parquet(out, service_id, days, chunks)
+            else:
+                rows = write_csv(out, service_id, days, chunks)
+            print(f"- {service_id}: {rows} stop_times rows, {len(days)} service dates ({fmt})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
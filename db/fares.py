@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+
+from gtfs_tables import optional_rows
+from snapshots import PerSnapshotCache
+
+
+@dataclass(frozen=True)
+class Fare:
+    fare_id: str
+    price: float
+    currency: str
+    transfers: int = None  # None = unlimited transfers
+    transfer_duration: int = None  # seconds; None = no time limit
+
+
+@dataclass
+class FareTable:
+    by_route_id: dict = field(default_factory=dict)
+    by_route_short_name: dict = field(default_factory=dict)
+
+    def fare_for(self, route_short_name):
+        return self.by_route_short_name.get(str(route_short_name))
+
+    def journey_fare(self, legs):
+        """Total price of legs [(route_short_name, depart_secs), ...].
+
+        A leg rides free when it uses the same fare_id as the ticket in hand,
+        that ticket still has transfers left and the leg departs within its
+        transfer_duration; otherwise a new fare is paid. Returns
+        (total, currency), or (None, None) when a leg's route has no fare.
+        """
+        total = 0.0
+        currency = None
+        ticket = None
+        bought_at = used = 0
+        for route, depart_secs in legs:
+            fare = self.fare_for(route)
+            if fare is None:
+                return None, None
+            free = (
+                ticket is not None
+                and ticket.fare_id == fare.fare_id
+                and (ticket.transfers is None or used < ticket.transfers)
+                and (
+                    ticket.transfer_duration is None
+                    or depart_secs - bought_at <= ticket.transfer_duration
+                )
+            )
+            if free:
+                used += 1
+                continue
+            ticket, bought_at, used = fare, depart_secs, 0
+            total += fare.price
+            currency = currency or fare.currency
+        return round(total, 2), currency
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compile_fares(attribute_rows, rule_rows, route_rows):
+    """Precompile fare_rules into route_id and route_short_name lookups.
+
+    Only route-based rules apply to this feed; rules keyed on zones
+    (origin_id/destination_id/contains_id) are skipped.
+    """
+    fares = {}
+    for row in attribute_rows:
+        try:
+            price = float(row["price"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        fares[row["fare_id"]] = Fare(
+            fare_id=row["fare_id"],
+            price=price,
+            currency=row.get("currency_type") or None,
+            transfers=to_int(row.get("transfers")),
+            transfer_duration=to_int(row.get("transfer_duration")),
+        )
+
+    table = FareTable()
+    for rule in rule_rows:
+        fare = fares.get(rule.get("fare_id"))
+        route_id = rule.get("route_id")
+        if fare is None or not route_id:
+            continue
+        if rule.get("origin_id") or rule.get("destination_id") or rule.get("contains_id"):
+            continue
+        current = table.by_route_id.get(route_id)
+        if current is None or fare.price < current.price:
+            table.by_route_id[route_id] = fare
+
+    for route_id, short_name in route_rows:
+        if route_id in table.by_route_id and short_name:
+            table.by_route_short_name[short_name] = table.by_route_id[route_id]
+    return table
+
+
+KEEP_FARE_TABLES = 2
+_FARE_TABLES = PerSnapshotCache(KEEP_FARE_TABLES)
+
+
+def fare_table(conn, gtfs_dir=None):
+    """FareTable for the database behind conn, compiled once per file; only
+    the newest KEEP_FARE_TABLES (one per published snapshot) are held."""
+    return _FARE_TABLES.get(
+        conn,
+        lambda conn: compile_fares(
+            optional_rows(conn, "fare_attributes", gtfs_dir),
+            optional_rows(conn, "fare_rules", gtfs_dir),
+            conn.execute("SELECT route_id, route_short_name FROM routes;").fetchall(),
+        ),
+    )
+
+
+def price_itinerary(fares, itinerary, first_depart_secs, second_depart_secs):
+    legs = [(itinerary["first_route"], first_depart_secs)]
+    # staying aboard through a block interline is a single ride
+    if not itinerary.get("interlined"):
+        legs.append((itinerary["second_route"], second_depart_secs))
+    fare, currency = fares.journey_fare(legs)
+    itinerary["fare"] = fare
+    itinerary["currency"] = currency
+    return itinerary
+
+
+def rank_key(rank):
+    """Sort key on predicted arrival (scheduled when no real-time overlay)."""
+
+    def arrival(it):
+        return it.get("predicted_final_arrive_secs", it["final_arrive_secs"])
+
+    if rank == "arrival_cost":
+        return lambda it: (
+            arrival(it),
+            float("inf") if it.get("fare") is None else it["fare"],
+        )
+    return arrival
@@ -0,0 +1,31 @@
+import csv
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GTFS_DIR = BASE_DIR / "RTSGTFS_Spring2026_V6"
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?;",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def optional_rows(conn, table, gtfs_dir=None):
+    """Rows of an optional GTFS table as dicts: from the database when the build
+    loaded it, otherwise parsed from the feed folder."""
+    if table_exists(conn, table):
+        cur = conn.execute(f'SELECT * FROM "{table}";')
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur]
+    path = Path(gtfs_dir or GTFS_DIR) / f"{table}.txt"
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        return [
+            {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            for row in csv.DictReader(f)
+        ]
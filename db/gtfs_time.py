@@ -0,0 +1,25 @@
+def time_to_secs(value):
+    if not value:
+        return None
+    parts = value.strip().split(":")
+    if len(parts) != 3:
+        return None
+    try:
+        hours, minutes, seconds = (int(p) for p in parts)
+    except ValueError:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def secs_to_time(secs):
+    if secs is None:
+        return None
+    hours, rem = divmod(int(secs), 3600)
+    minutes, seconds = divmod(rem, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def secs_to_clock(secs):
+    if secs is None:
+        return None
+    return secs_to_time(int(secs) % 86400)
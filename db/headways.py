@@ -0,0 +1,171 @@
+import heapq
+import json
+import statistics
+from itertools import groupby
+from pathlib import Path
+
+from service_calendar import active_service_ids, service_dates
+from snapshots import connect_snapshot, current_snapshot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+
+
+def connect_db():
+    return connect_snapshot(current_snapshot(DB_PATH))
+
+
+def iter_departures(conn):
+    pattern_stops = {}
+    for pattern_id, stop_id in conn.execute(
+        "SELECT pattern_id, stop_id FROM pattern_stops ORDER BY pattern_id, stop_index;"
+    ):
+        pattern_stops.setdefault(pattern_id, []).append(stop_id)
+
+    for pattern_id, start, offsets, route_id, direction_id, service_id in conn.execute(
+        "SELECT tp.pattern_id, tp.start_secs, tp.departure_offsets, "
+        "t.route_id, t.direction_id, t.service_id "
+        "FROM trip_patterns tp JOIN trips t ON t.trip_id = tp.trip_id;"
+    ):
+        if start is None:
+            continue
+        stops = pattern_stops.get(pattern_id, [])
+        for stop_id, offset in zip(stops, json.loads(offsets)):
+            if offset is not None:
+                yield (route_id, stop_id, direction_id, service_id, start + offset)
+
+
+def summarize(gaps):
+    if not gaps:
+        return None, None, None
+    return min(gaps), int(statistics.median(gaps)), max(gaps)
+
+
+def service_sets(conn):
+    """Distinct sets of services that run together on some date, as sorted tuples."""
+    by_date = {}
+    for service_id, days in service_dates(conn).items():
+        for day in days:
+            by_date.setdefault(day, []).append(service_id)
+    return sorted({tuple(sorted(ids)) for ids in by_date.values()})
+
+
+def service_set_key(service_ids):
+    return json.dumps(sorted(service_ids))
+
+
+def build_headways(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS headways ("
+        "route_id TEXT, "
+        "stop_id TEXT, "
+        "direction_id TEXT, "
+        "service_set TEXT, "
+        "hour_band INTEGER, "
+        "departures INTEGER, "
+        "min_headway_secs INTEGER, "
+        "median_headway_secs INTEGER, "
+        "max_headway_secs INTEGER"
+        ");"
+    )
+
+    # Services that run on the same day (e.g. Weekday and Mon-Thur) both serve
+    # the stop, so gaps are measured over their merged departures.
+    sets = [(service_set_key(ids), set(ids)) for ids in service_sets(conn)]
+    departures = sorted(iter_departures(conn))
+    batch = []
+    for key, group in groupby(departures, key=lambda d: d[:3]):
+        by_service = {}
+        for d in group:
+            by_service.setdefault(d[3], []).append(d[4])
+        for set_key, ids in sets:
+            streams = [times for service_id, times in by_service.items() if service_id in ids]
+            if not streams:
+                continue
+            times = list(heapq.merge(*streams))
+            bands = {}
+            for i, secs in enumerate(times):
+                band = bands.setdefault(secs // 3600, {"departures": 0, "gaps": []})
+                band["departures"] += 1
+                if i + 1 < len(times):
+                    band["gaps"].append(times[i + 1] - secs)
+
+            all_gaps = [times[i + 1] - times[i] for i in range(len(times) - 1)]
+            row = key + (set_key,)
+            batch.append(row + (None, len(times)) + summarize(all_gaps))
+            for hour, band in sorted(bands.items()):
+                batch.append(row + (hour, band["departures"]) + summarize(band["gaps"]))
+
+        if len(batch) >= 5000:
+            cur.executemany(
+                "INSERT INTO headways VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);", batch
+            )
+            batch = []
+    if batch:
+        cur.executemany("INSERT INTO headways VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);", batch)
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_headways_route_stop "
+        "ON headways(route_id, stop_id, service_set, hour_band);"
+    )
+
+
+def lookup_headways(conn, route_short_name, date_str, stop_id_padded=None, hour=None):
+    sql = """
+    SELECT rs.direction_id, rs.stop_id_padded, rs.stop_name, rs.headsigns,
+           h.hour_band, h.departures,
+           h.min_headway_secs, h.median_headway_secs, h.max_headway_secs
+    FROM route_stops rs
+    JOIN headways h ON h.route_id = rs.route_id
+                   AND h.stop_id = rs.stop_id
+                   AND h.direction_id = rs.direction_id
+    WHERE rs.route_short_name = :route
+      AND (:stop_id IS NULL OR rs.stop_id_padded = :stop_id)
+      AND h.service_set = :service_set
+      AND h.hour_band IS :hour
+    ORDER BY rs.direction_id, h.departures DESC, rs.first_stop_sequence;
+    """
+    params = {
+        "route": route_short_name,
+        "stop_id": stop_id_padded,
+        "service_set": service_set_key(active_service_ids(conn, date_str)),
+        "hour": hour,
+    }
+
+    # One row per direction: the busiest stop (or the requested one) across
+    # every service running that day.
+    result = []
+    seen_directions = set()
+    for r in conn.execute(sql, params).fetchall():
+        if r["direction_id"] in seen_directions:
+            continue
+        seen_directions.add(r["direction_id"])
+        result.append(
+            {
+                "direction_id": r["direction_id"],
+                "stop_id_padded": r["stop_id_padded"],
+                "stop_name": r["stop_name"],
+                "headsigns": json.loads(r["headsigns"]),
+                "hour_band": r["hour_band"],
+                "departures": r["departures"],
+                "min_headway_secs": r["min_headway_secs"],
+                "median_headway_secs": r["median_headway_secs"],
+                "max_headway_secs": r["max_headway_secs"],
+            }
+        )
+    return result
+
+
+def main():
+    conn = connect_db()
+    try:
+        for h in lookup_headways(conn, "12", "2026-01-28", hour=8):
+            print(h)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+
+
+CHUNK_SIZE = 1 << 16
+
+
+class JsonStream:
+    """Pull JSON values one at a time from a text file with a bounded buffer.
+
+    Only the structural characters between values ({ } [ ] : ,) are handled by
+    hand; each value itself is decoded with json.JSONDecoder.raw_decode, so
+    memory is bounded by the largest single value rather than the file.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, ch):
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"expected {ch!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number ending exactly at the buffer edge may continue
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_members(path, array_keys=()):
+    """Yield (key, value) for each top-level member of the JSON object at path.
+
+    Members named in array_keys must hold arrays; they are yielded as one
+    (key, item) pair per element instead of a single list.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        stream.take("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.take(":")
+            if key in array_keys:
+                stream.take("[")
+                while stream.peek() != "]":
+                    yield key, stream.value()
+                    if stream.peek() == ",":
+                        stream.take(",")
+                stream.take("]")
+            else:
+                yield key, stream.value()
+            if stream.peek() == ",":
+                stream.take(",")
+        stream.take("}")
@@ -0,0 +1,416 @@
+import json
+from bisect import bisect_left
+from pathlib import Path
+
+from catalog import Catalog
+from fares import fare_table, price_itinerary, rank_key
+from gtfs_tables import table_exists
+from gtfs_time import secs_to_clock, time_to_secs
+from realtime import overlay_itineraries
+from snapshots import connect_snapshot, current_snapshot
+from transfer_search import search_fastest_one_transfer
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+DEFAULTS_PATH = BASE_DIR / "db" / "answering_defaults.json"
+BUSIEST_STOPS = 6
+
+# Column order of each entry in od_itineraries.legs. New fields go at the end
+# so rows written by earlier builds still line up (read them with .get).
+LEG_FIELDS = (
+    "first_route",
+    "first_headsign",
+    "first_trip_id",
+    "first_board_seq",
+    "first_alight_seq",
+    "transfer_stop_id",
+    "transfer_stop_name",
+    "transfer_arrive_secs",
+    "second_route",
+    "second_headsign",
+    "second_trip_id",
+    "second_board_seq",
+    "second_alight_seq",
+    "second_depart_secs",
+    "final_arrive_secs",
+    "interlined",
+    "first_day_offset",
+    "second_day_offset",
+)
+ARRIVE = LEG_FIELDS.index("final_arrive_secs")
+
+
+def connect_db():
+    return connect_snapshot(current_snapshot(DB_PATH))
+
+
+def popular_stops(conn, busiest=BUSIEST_STOPS):
+    stops = []
+    if DEFAULTS_PATH.exists():
+        with DEFAULTS_PATH.open("r", encoding="utf-8") as f:
+            stops = [d["stop_id_padded"] for d in json.load(f).get("default_stops", [])]
+    for (stop_id_padded,) in conn.execute(
+        "SELECT s.stop_id_padded FROM stop_times st "
+        "JOIN stops s ON s.stop_id = st.stop_id "
+        "WHERE s.stop_id_padded IS NOT NULL "
+        "GROUP BY s.stop_id_padded ORDER BY COUNT(*) DESC LIMIT ?;",
+        (busiest,),
+    ):
+        if stop_id_padded not in stops:
+            stops.append(stop_id_padded)
+    return stops
+
+
+def create_day_types(conn):
+    """Group service dates that run the same (day_offset, service_id) set."""
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS service_day_types ("
+        "service_date TEXT PRIMARY KEY, "
+        "day_type INTEGER"
+        ");"
+    )
+    signatures = {}
+    for service_date, day_offset, service_id in conn.execute(
+        "SELECT service_date, day_offset, service_id FROM service_days "
+        "ORDER BY service_date, day_offset, service_id;"
+    ):
+        signatures.setdefault(service_date, []).append((day_offset, service_id))
+
+    day_types = {}
+    representatives = {}
+    batch = []
+    for service_date in sorted(signatures):
+        key = tuple(signatures[service_date])
+        if key not in day_types:
+            day_types[key] = len(day_types)
+            representatives[day_types[key]] = service_date
+        batch.append((service_date, day_types[key]))
+    cur.executemany(
+        "INSERT INTO service_day_types (service_date, day_type) VALUES (?, ?);", batch
+    )
+    return representatives
+
+
+def second_leg_profiles(conn, date_str, to_stop_id):
+    """Per boarding stop: departures to the destination with suffix-best arrivals.
+
+    best[i] is the earliest-arriving ride among departures[i:], so the fastest
+    second leg after time t is best[bisect_left(departures, t)].
+    """
+    rows = conn.execute(
+        """
+        SELECT st_from.stop_id,
+               st_from.departure_secs - sd.day_offset AS depart_secs,
+               st_to.arrival_secs - sd.day_offset AS arrive_secs,
+               r.route_short_name, t.trip_headsign,
+               t.trip_id, st_from.stop_sequence, st_to.stop_sequence, sd.day_offset
+        FROM stop_times st_to
+        JOIN stop_times st_from ON st_from.trip_id = st_to.trip_id
+        JOIN trips t ON t.trip_id = st_to.trip_id
+        JOIN routes r ON r.route_id = t.route_id
+        JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
+        WHERE st_to.stop_id = :to_stop_id
+          AND st_from.departure_secs IS NOT NULL
+          AND st_to.arrival_secs IS NOT NULL
+          AND CAST(st_from.stop_sequence AS INTEGER) < CAST(st_to.stop_sequence AS INTEGER)
+        ORDER BY st_from.stop_id, depart_secs;
+        """,
+        {"date": date_str, "to_stop_id": to_stop_id},
+    ).fetchall()
+
+    grouped = {}
+    for r in rows:
+        grouped.setdefault(r[0], []).append(tuple(r[1:]))
+    profiles = {}
+    for stop_id, rides in grouped.items():
+        best = [None] * len(rides)
+        current = None
+        for i in range(len(rides) - 1, -1, -1):
+            if current is None or rides[i][1] < current[1]:
+                current = rides[i]
+            best[i] = current
+        profiles[stop_id] = ([ride[0] for ride in rides], best)
+    return profiles
+
+
+def first_legs(conn, date_str, from_stop_id, catalog):
+    """Departures from the origin with the (stop_id, arrival) of every stop
+    each trip reaches afterwards, on the date's seconds timeline."""
+    rows = conn.execute(
+        """
+        SELECT st.trip_id, st.departure_secs - sd.day_offset AS depart_secs,
+               sd.day_offset, st.stop_sequence
+        FROM stop_times st
+        JOIN trips t ON t.trip_id = st.trip_id
+        JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
+        WHERE st.stop_id = :from_stop_id
+          AND st.departure_secs IS NOT NULL
+        ORDER BY depart_secs;
+        """,
+        {"date": date_str, "from_stop_id": from_stop_id},
+    ).fetchall()
+    legs = []
+    for trip_id, depart_secs, day_offset, stop_sequence in rows:
+        trip = catalog.trip_index[trip_id]
+        downstream = [
+            (stop_id, secs - day_offset, seq)
+            for stop_id, secs, seq in catalog.downstream(trip, stop_sequence)
+            if secs is not None
+        ]
+        legs.append(
+            (
+                depart_secs,
+                catalog.route_short_name_of(trip),
+                catalog.headsign_of(trip),
+                catalog.trip_ids[trip],
+                stop_sequence,
+                downstream,
+                trip,
+                day_offset,
+            )
+        )
+    return legs
+
+
+def pareto_itineraries(legs, profiles, catalog, to_stop_id):
+    """Whole-day one-transfer itineraries no other option beats on both
+    departure (later) and arrival (earlier), ordered by departure.
+
+    Staying aboard into the next trip of the block counts as the transfer
+    when it reaches to_stop_id; a real transfer must arrive strictly earlier
+    to replace it.
+    """
+    candidates = []
+    for leg in legs:
+        depart_secs, route, headsign, trip_id, board_seq, downstream, trip, offset = leg
+        best = None
+        via = catalog.interline(trip, to_stop_id) if downstream else None
+        if via is not None:
+            stop_id, arrive, alight_seq, following, next_board, depart, final, final_seq = via
+            best = (
+                route,
+                headsign,
+                trip_id,
+                board_seq,
+                alight_seq,
+                stop_id,
+                catalog.stop_name_of(stop_id),
+                arrive - offset,
+                catalog.route_short_name_of(following),
+                catalog.headsign_of(following),
+                catalog.trip_ids[following],
+                next_board,
+                final_seq,
+                depart - offset,
+                final - offset,
+                True,
+                offset,
+                offset,
+            )
+        for stop_id, transfer_arrive, alight_seq in downstream:
+            profile = profiles.get(stop_id)
+            if profile is None:
+                continue
+            departures, rides = profile
+            i = bisect_left(departures, transfer_arrive)
+            if i == len(departures):
+                continue
+            ride = rides[i]
+            if best is None or ride[1] < best[ARRIVE]:
+                best = (
+                    route,
+                    headsign,
+                    trip_id,
+                    board_seq,
+                    alight_seq,
+                    stop_id,
+                    catalog.stop_name_of(stop_id),
+                    transfer_arrive,
+                    ride[2],
+                    ride[3],
+                    ride[4],
+                    ride[5],
+                    ride[6],
+                    ride[0],
+                    ride[1],
+                    False,
+                    offset,
+                    ride[7],
+                )
+        if best is not None:
+            candidates.append((depart_secs, best))
+
+    front = []
+    earliest = None
+    for depart, legs_row in sorted(candidates, key=lambda c: (-c[0], c[1][ARRIVE])):
+        if earliest is None or legs_row[ARRIVE] < earliest:
+            earliest = legs_row[ARRIVE]
+            front.append((depart, legs_row))
+    front.reverse()
+    return front
+
+
+def build_od_table(conn, stops=None):
+    cur = conn.cursor()
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS od_itineraries ("
+        "from_stop_id_padded TEXT, "
+        "to_stop_id_padded TEXT, "
+        "day_type INTEGER, "
+        "departs TEXT, "
+        "legs TEXT, "
+        "PRIMARY KEY (from_stop_id_padded, to_stop_id_padded, day_type)"
+        ");"
+    )
+    representatives = create_day_types(conn)
+    padded = stops or popular_stops(conn)
+    placeholders = ",".join("?" for _ in padded)
+    stop_ids = dict(
+        conn.execute(
+            f"SELECT stop_id_padded, stop_id FROM stops WHERE stop_id_padded IN ({placeholders});",
+            padded,
+        ).fetchall()
+    )
+    catalog = Catalog.load(conn)
+
+    for day_type, date_str in representatives.items():
+        profiles = {
+            to_padded: second_leg_profiles(conn, date_str, stop_ids[to_padded])
+            for to_padded in padded
+            if to_padded in stop_ids
+        }
+        batch = []
+        for from_padded in padded:
+            if from_padded not in stop_ids:
+                continue
+            legs = first_legs(conn, date_str, stop_ids[from_padded], catalog)
+            for to_padded, to_profiles in profiles.items():
+                if to_padded == from_padded:
+                    continue
+                front = pareto_itineraries(
+                    legs, to_profiles, catalog, stop_ids[to_padded]
+                )
+                batch.append(
+                    (
+                        from_padded,
+                        to_padded,
+                        day_type,
+                        json.dumps([depart for depart, _ in front]),
+                        json.dumps([list(row) for _, row in front], ensure_ascii=False),
+                    )
+                )
+        cur.executemany(
+            "INSERT INTO od_itineraries "
+            "(from_stop_id_padded, to_stop_id_padded, day_type, departs, legs) "
+            "VALUES (?, ?, ?, ?, ?);",
+            batch,
+        )
+
+
+def lookup_one_transfer(
+    conn, date_str, time_str, from_stop_id_padded, to_stop_id_padded, limit=3, rank="arrival"
+):
+    """Answer from od_itineraries, or return None when the pair is not listed."""
+    row = conn.execute(
+        "SELECT o.departs, o.legs FROM od_itineraries o "
+        "JOIN service_day_types d ON d.day_type = o.day_type "
+        "WHERE d.service_date = ? AND o.from_stop_id_padded = ? "
+        "AND o.to_stop_id_padded = ?;",
+        (date_str, from_stop_id_padded, to_stop_id_padded),
+    ).fetchone()
+    if row is None:
+        return None
+
+    names = dict(
+        conn.execute(
+            "SELECT stop_id_padded, stop_name FROM stops WHERE stop_id_padded IN (?, ?);",
+            (from_stop_id_padded, to_stop_id_padded),
+        ).fetchall()
+    )
+    departs = json.loads(row[0])
+    legs = json.loads(row[1])
+    # Pareto order: arrivals rise with departures, so the next options after
+    # the requested time are also the fastest ones. A few extra are read in
+    # case real-time delays break or reorder some of them.
+    start = bisect_left(departs, time_to_secs(time_str) or 0)
+    end = start + limit * 3
+    fares = fare_table(conn)
+    options = []
+    for depart, values in zip(departs[start:end], legs[start:end]):
+        leg = dict(zip(LEG_FIELDS, values))
+        itinerary = {
+            "first_route": leg["first_route"],
+            "first_headsign": leg["first_headsign"],
+            "first_depart": secs_to_clock(depart),
+            "transfer_stop_id": leg["transfer_stop_id"],
+            "transfer_stop_name": leg["transfer_stop_name"],
+            "transfer_arrive": secs_to_clock(leg["transfer_arrive_secs"]),
+            "second_route": leg["second_route"],
+            "second_headsign": leg["second_headsign"],
+            "second_depart": secs_to_clock(leg["second_depart_secs"]),
+            "final_arrive": secs_to_clock(leg["final_arrive_secs"]),
+            "final_arrive_secs": leg["final_arrive_secs"],
+            "interlined": bool(leg.get("interlined")),
+            "first_trip_id": leg["first_trip_id"],
+            "first_board_seq": leg["first_board_seq"],
+            "first_alight_seq": leg["first_alight_seq"],
+            "first_depart_secs": depart,
+            "transfer_arrive_secs": leg["transfer_arrive_secs"],
+            "second_trip_id": leg["second_trip_id"],
+            "second_board_seq": leg["second_board_seq"],
+            "second_alight_seq": leg["second_alight_seq"],
+            "second_depart_secs": leg["second_depart_secs"],
+            "first_day_offset": leg.get("first_day_offset", 0),
+            "second_day_offset": leg.get("second_day_offset", 0),
+        }
+        options.append(
+            price_itinerary(fares, itinerary, depart, leg["second_depart_secs"])
+        )
+    options = overlay_itineraries(options, date_str)
+    options.sort(key=rank_key(rank))
+    return {
+        "from_name": names.get(from_stop_id_padded),
+        "to_name": names.get(to_stop_id_padded),
+        "options": options[:limit],
+    }
+
+
+def fastest_one_transfer(
+    date, time, from_stop_id_padded, to_stop_id_padded, limit=3, conn=None, rank="arrival"
+):
+    """Precomputed answer for popular pairs, live search for everything else."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_db()
+    try:
+        result = None
+        # databases built before od_itineraries existed go straight to the live search
+        if table_exists(conn, "od_itineraries") and table_exists(conn, "service_day_types"):
+            result = lookup_one_transfer(
+                conn, date, time, from_stop_id_padded, to_stop_id_padded, limit, rank
+            )
+        if result is None:
+            result = search_fastest_one_transfer(
+                date, time, from_stop_id_padded, to_stop_id_padded, limit, conn, rank
+            )
+        return result
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main():
+    conn = connect_db()
+    try:
+        result = fastest_one_transfer("2026-01-31", "14:50:00", "0473", "1492", conn=conn)
+        print(f"From: {result['from_name']} -> {result['to_name']}")
+        for i, it in enumerate(result["options"], 1):
+            print(f"Option {i}: {it}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+from gtfs_time import secs_to_time
+from snapshots import connect_snapshot, current_snapshot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+
+
+def connect_db():
+    return connect_snapshot(current_snapshot(DB_PATH))
+
+
+def load_pattern(conn, pattern_id, cache=None):
+    if cache is not None and pattern_id in cache:
+        return cache[pattern_id]
+    rows = conn.execute(
+        "SELECT stop_id, stop_sequence FROM pattern_stops "
+        "WHERE pattern_id = ? ORDER BY stop_index;",
+        (pattern_id,),
+    ).fetchall()
+    pattern = [(r[0], r[1]) for r in rows]
+    if cache is not None:
+        cache[pattern_id] = pattern
+    return pattern
+
+
+def load_trip_pattern(conn, trip_id):
+    row = conn.execute(
+        "SELECT pattern_id, start_secs, arrival_offsets, departure_offsets "
+        "FROM trip_patterns WHERE trip_id = ?;",
+        (trip_id,),
+    ).fetchone()
+    if not row:
+        return None
+    return {
+        "pattern_id": row[0],
+        "start_secs": row[1],
+        "arrival_offsets": json.loads(row[2]),
+        "departure_offsets": json.loads(row[3]),
+    }
+
+
+def trip_stop_times(conn, trip_id, cache=None):
+    trip = load_trip_pattern(conn, trip_id)
+    if not trip:
+        return []
+    start = trip["start_secs"]
+    result = []
+    for i, (stop_id, seq) in enumerate(load_pattern(conn, trip["pattern_id"], cache)):
+        arr = trip["arrival_offsets"][i]
+        dep = trip["departure_offsets"][i]
+        arrival_secs = None if arr is None else start + arr
+        departure_secs = None if dep is None else start + dep
+        result.append(
+            {
+                "trip_id": trip_id,
+                "stop_id": stop_id,
+                "stop_sequence": seq,
+                "arrival_time": secs_to_time(arrival_secs),
+                "departure_time": secs_to_time(departure_secs),
+                "arrival_secs": arrival_secs,
+                "departure_secs": departure_secs,
+            }
+        )
+    return result
+
+
+def downstream_stops(conn, trip_id, after_stop_sequence, cache=None):
+    after = int(after_stop_sequence)
+    return [
+        st
+        for st in trip_stop_times(conn, trip_id, cache)
+        if int(st["stop_sequence"]) > after
+    ]
+
+
+def routes_serving_stop(conn, stop_id_padded):
+    sql = """
+    SELECT DISTINCT r.route_id, r.route_short_name, r.route_long_name
+    FROM route_stops rs
+    JOIN routes r ON r.route_id = rs.route_id
+    WHERE rs.stop_id_padded = :stop_id_padded
+    ORDER BY r.route_short_name;
+    """
+    return conn.execute(sql, {"stop_id_padded": stop_id_padded}).fetchall()
+
+
+def main():
+    conn = connect_db()
+    try:
+        total_trips = conn.execute("SELECT COUNT(*) FROM trip_patterns;").fetchone()[0]
+        total_patterns = conn.execute("SELECT COUNT(*) FROM patterns;").fetchone()[0]
+        print(f"{total_trips} trips share {total_patterns} stop patterns")
+        for r in routes_serving_stop(conn, "0001"):
+            print(f"- route {r['route_short_name']}: {r['route_long_name']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,230 +8,104 @@ WHERE stop_name LIKE :stop_name_like
 ORDER BY stop_name;
 
 -- 2) Routes serving a stop (by stop_id_padded)
+-- Point read on the precomputed route_stops adjacency (one row per direction).
 -- :stop_id_padded -> "0027"
-SELECT DISTINCT r.route_id, r.route_short_name, r.route_long_name
-FROM routes r
-JOIN trips t ON t.route_id = r.route_id
-JOIN stop_times st ON st.trip_id = t.trip_id
-JOIN stops s ON s.stop_id = st.stop_id
-WHERE s.stop_id_padded = :stop_id_padded
-ORDER BY r.route_short_name;
+SELECT rs.route_id, rs.route_short_name, r.route_long_name,
+       rs.direction_id, rs.first_stop_sequence, rs.last_stop_sequence, rs.headsigns
+FROM route_stops rs
+JOIN routes r ON r.route_id = rs.route_id
+WHERE rs.stop_id_padded = :stop_id_padded
+ORDER BY rs.route_short_name, rs.direction_id;
 
 -- 3) Departures for a route + stop on a given date
+-- service_days already applies calendar_dates overrides (1=add, 2=remove); day_offset 0
+-- keeps the date's own service, including its trips past 24:00 (dep_secs >= 86400).
+-- Format dep_secs with gtfs_time.secs_to_time.
 -- :route_short_name -> "5"
 -- :stop_name_like -> "%Rosa Parks%"
 -- :date -> "2026-01-28"
-SELECT st.departure_time, t.trip_id, t.trip_headsign
+SELECT st.departure_secs AS dep_secs, t.trip_id, t.trip_headsign
 FROM stops s
 JOIN stop_times st ON st.stop_id = s.stop_id
 JOIN trips t ON t.trip_id = st.trip_id
 JOIN routes r ON r.route_id = t.route_id
-JOIN calendar c ON c.service_id = t.service_id
+JOIN service_days sd ON sd.service_id = t.service_id
+  AND sd.service_date = :date AND sd.day_offset = 0
 WHERE r.route_short_name = :route_short_name
   AND s.stop_name LIKE :stop_name_like
-  AND :date BETWEEN c.start_date AND c.end_date
-  AND (
-    (c.monday = 1 AND strftime('%w', :date) = '1') OR
-    (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-    (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-    (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-    (c.friday = 1 AND strftime('%w', :date) = '5') OR
-    (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-    (c.sunday = 1 AND strftime('%w', :date) = '0')
-  )
-ORDER BY st.departure_time;
+ORDER BY dep_secs;
 
--- 4) Departures for a route + stop on a given date (with exceptions)
--- This applies calendar_dates overrides (1=add, 2=remove).
+-- 4) Departures for a route + stop on a given calendar day (00:00 to 24:00)
+-- Adds the previous day's trips past 24:00 (day_offset 86400) and drops this
+-- service day's own trips past 24:00, so every dep_secs falls within :date.
 -- :route_short_name -> "5"
 -- :stop_name_like -> "%Rosa Parks%"
 -- :date -> "2026-01-28"
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-)
-SELECT st.departure_time, t.trip_id, t.trip_headsign
+SELECT st.departure_secs - sd.day_offset AS dep_secs, t.trip_id, t.trip_headsign
 FROM stops s
 JOIN stop_times st ON st.stop_id = s.stop_id
 JOIN trips t ON t.trip_id = st.trip_id
 JOIN routes r ON r.route_id = t.route_id
-JOIN active_services a ON a.service_id = t.service_id
+JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
 WHERE r.route_short_name = :route_short_name
   AND s.stop_name LIKE :stop_name_like
-ORDER BY st.departure_time;
+  AND st.departure_secs >= sd.day_offset
+  AND st.departure_secs < sd.day_offset + 86400
+ORDER BY dep_secs;
 
--- 5) Next departures after a given time (with exceptions)
+-- 5) Next departures after a given time
 -- :route_short_name -> "5"
 -- :stop_name_like -> "%Rosa Parks%"
 -- :date -> "2026-01-28"
--- :time -> "14:30:00"
+-- :after_secs -> 52200 (14:30:00, gtfs_time.time_to_secs)
 -- :limit -> 10
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-)
-SELECT st.departure_time, t.trip_id, t.trip_headsign
+SELECT st.departure_secs - sd.day_offset AS dep_secs, t.trip_id, t.trip_headsign
 FROM stops s
 JOIN stop_times st ON st.stop_id = s.stop_id
 JOIN trips t ON t.trip_id = st.trip_id
 JOIN routes r ON r.route_id = t.route_id
-JOIN active_services a ON a.service_id = t.service_id
+JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
 WHERE r.route_short_name = :route_short_name
   AND s.stop_name LIKE :stop_name_like
-  AND st.departure_time >= :time
-ORDER BY st.departure_time
+  AND st.departure_secs >= :after_secs + sd.day_offset
+ORDER BY dep_secs
 LIMIT :limit;
 
--- 6) Next departures from a stop (any route) after a given time (with exceptions)
+-- 6) Next departures from a stop (any route) after a given time
+-- db/departures.py departure_board() serves this for a stop or station cluster by
+-- merging per-route sorted departure streams instead of one wide join.
 -- :stop_name_like -> "%Rosa Parks%"
 -- :date -> "2026-01-28"
--- :time -> "14:30:00"
+-- :after_secs -> 52200 (14:30:00)
 -- :limit -> 10
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-)
-SELECT st.departure_time, r.route_short_name, t.trip_id, t.trip_headsign
+SELECT st.departure_secs - sd.day_offset AS dep_secs,
+       r.route_short_name, t.trip_id, t.trip_headsign
 FROM stops s
 JOIN stop_times st ON st.stop_id = s.stop_id
 JOIN trips t ON t.trip_id = st.trip_id
 JOIN routes r ON r.route_id = t.route_id
-JOIN active_services a ON a.service_id = t.service_id
+JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
 WHERE s.stop_name LIKE :stop_name_like
-  AND st.departure_time >= :time
-ORDER BY st.departure_time
+  AND st.departure_secs >= :after_secs + sd.day_offset
+ORDER BY dep_secs
 LIMIT :limit;
 
--- 7) First and last departures for a route + stop on a given date (with exceptions)
+-- 7) First and last departures for a route + stop on a given service day
+-- The last departure may be past 24:00 (last_secs >= 86400).
 -- :route_short_name -> "5"
 -- :stop_name_like -> "%Rosa Parks%"
 -- :date -> "2026-01-28"
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-),
-departures AS (
-  SELECT st.departure_time
-  FROM stops s
-  JOIN stop_times st ON st.stop_id = s.stop_id
-  JOIN trips t ON t.trip_id = st.trip_id
-  JOIN routes r ON r.route_id = t.route_id
-  JOIN active_services a ON a.service_id = t.service_id
-  WHERE r.route_short_name = :route_short_name
-    AND s.stop_name LIKE :stop_name_like
-)
 SELECT
-  MIN(departure_time) AS first_departure,
-  MAX(departure_time) AS last_departure
-FROM departures;
+  MIN(st.departure_secs) AS first_secs,
+  MAX(st.departure_secs) AS last_secs
+FROM stops s
+JOIN stop_times st ON st.stop_id = s.stop_id
+JOIN trips t ON t.trip_id = st.trip_id
+JOIN routes r ON r.route_id = t.route_id
+JOIN service_days sd ON sd.service_id = t.service_id
+  AND sd.service_date = :date AND sd.day_offset = 0
+WHERE r.route_short_name = :route_short_name
+  AND s.stop_name LIKE :stop_name_like;
 
 -- 8) Resolve a fuzzy name to an entity (stops/routes/headsigns)
 -- :normalized_like -> "%rosa parks%"
@@ -244,67 +118,35 @@ LIMIT 25;
 -- 9) Route-scoped stop lookup by name (only stops served by a route)
 -- :route_short_name -> "12"
 -- :stop_name_like -> "%Dollar General%"
-SELECT DISTINCT s.stop_id, s.stop_id_padded, s.stop_name
-FROM stops s
-JOIN stop_times st ON st.stop_id = s.stop_id
-JOIN trips t ON t.trip_id = st.trip_id
-JOIN routes r ON r.route_id = t.route_id
-WHERE r.route_short_name = :route_short_name
-  AND s.stop_name LIKE :stop_name_like
-ORDER BY s.stop_name;
+SELECT DISTINCT stop_id, stop_id_padded, stop_name
+FROM route_stops
+WHERE route_short_name = :route_short_name
+  AND stop_name LIKE :stop_name_like
+ORDER BY stop_name;
 
 -- 10) Next departures for a route + stop with explicit direction or headsign filter
 -- Use one of: :direction_id (0/1) OR :headsign_like ("%Oaks Mall%")
+-- db/departures.py next_departures() serves this with optional filters and
+-- cursor pagination on (departure_secs, trip_id).
 -- :route_short_name -> "5"
 -- :stop_id_padded -> "0001"
 -- :date -> "2026-01-28"
--- :time -> "14:30:00"
+-- :after_secs -> 52200 (14:30:00)
 -- :limit -> 10
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-)
-SELECT st.departure_time, t.trip_headsign, t.direction_id
+SELECT st.departure_secs - sd.day_offset AS dep_secs, t.trip_headsign, t.direction_id
 FROM stops s
 JOIN stop_times st ON st.stop_id = s.stop_id
 JOIN trips t ON t.trip_id = st.trip_id
 JOIN routes r ON r.route_id = t.route_id
-JOIN active_services a ON a.service_id = t.service_id
+JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
 WHERE r.route_short_name = :route_short_name
   AND s.stop_id_padded = :stop_id_padded
-  AND st.departure_time >= :time
+  AND st.departure_secs >= :after_secs + sd.day_offset
   AND (
     (:direction_id IS NOT NULL AND t.direction_id = :direction_id)
     OR (:headsign_like IS NOT NULL AND t.trip_headsign LIKE :headsign_like)
   )
-ORDER BY st.departure_time
+ORDER BY dep_secs
 LIMIT :limit;
 
 -- 11) Next departures for a route + stop with no direction provided
@@ -312,54 +154,51 @@ LIMIT :limit;
 -- :route_short_name -> "38"
 -- :stop_id_padded -> "0018"
 -- :date -> "2026-01-28"
--- :time -> "07:30:00"
-WITH base_services AS (
-  SELECT c.service_id
-  FROM calendar c
-  WHERE :date BETWEEN c.start_date AND c.end_date
-    AND (
-      (c.monday = 1 AND strftime('%w', :date) = '1') OR
-      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-      (c.friday = 1 AND strftime('%w', :date) = '5') OR
-      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-      (c.sunday = 1 AND strftime('%w', :date) = '0')
-    )
-),
-exception_add AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 1
-),
-exception_remove AS (
-  SELECT service_id
-  FROM calendar_dates
-  WHERE date = :date AND exception_type = 2
-),
-active_services AS (
-  SELECT service_id FROM base_services
-  UNION
-  SELECT service_id FROM exception_add
-  EXCEPT
-  SELECT service_id FROM exception_remove
-),
-ranked AS (
-  SELECT st.departure_time, t.trip_headsign,
-         ROW_NUMBER() OVER (PARTITION BY t.trip_headsign ORDER BY st.departure_time) AS rn
+-- :after_secs -> 27000 (07:30:00)
+WITH ranked AS (
+  SELECT st.departure_secs - sd.day_offset AS dep_secs, t.trip_headsign,
+         ROW_NUMBER() OVER (
+           PARTITION BY t.trip_headsign ORDER BY st.departure_secs - sd.day_offset
+         ) AS rn
   FROM stops s
   JOIN stop_times st ON st.stop_id = s.stop_id
   JOIN trips t ON t.trip_id = st.trip_id
   JOIN routes r ON r.route_id = t.route_id
-  JOIN active_services a ON a.service_id = t.service_id
+  JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
   WHERE r.route_short_name = :route_short_name
     AND s.stop_id_padded = :stop_id_padded
-    AND st.departure_time >= :time
+    AND st.departure_secs >= :after_secs + sd.day_offset
 )
-SELECT departure_time, trip_headsign
+SELECT dep_secs, trip_headsign
 FROM ranked
 WHERE rn = 1
-ORDER BY departure_time;
+ORDER BY dep_secs;
 
 -- 12) Fastest 1-transfer search (implemented in Python for performance/clarity)
 -- See db/transfer_search.py for a reusable helper.
+
+-- 13) Stops of a trip, rebuilt from its stop pattern and time offsets
+-- :trip_id -> "Weekday-1-A-IB-0627-6c161db"
+SELECT stop_id, stop_sequence, arrival_secs, departure_secs
+FROM pattern_stop_times
+WHERE trip_id = :trip_id
+ORDER BY CAST(stop_sequence AS INTEGER);
+
+-- 14) Next departures across midnight on one seconds timeline
+-- service_days lists the services of :date (day_offset 0) plus the previous
+-- day's services with trips past 24:00 (day_offset 86400).
+-- :stop_id_padded -> "0925"
+-- :date -> "2026-01-28"
+-- :after_secs -> 1800 (00:30:00)
+-- :limit -> 10
+SELECT st.departure_secs - sd.day_offset AS dep_secs,
+       r.route_short_name, t.trip_id, t.trip_headsign
+FROM stops s
+JOIN stop_times st ON st.stop_id = s.stop_id
+JOIN trips t ON t.trip_id = st.trip_id
+JOIN routes r ON r.route_id = t.route_id
+JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
+WHERE s.stop_id_padded = :stop_id_padded
+  AND st.departure_secs >= :after_secs + sd.day_offset
+ORDER BY dep_secs
+LIMIT :limit;
@@ -0,0 +1,239 @@
+import re
+import time as time_mod
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<iso>\b20\d{2}-\d{2}-\d{2}\b)
+    |(?P<mdy>\b\d{1,2}/\d{1,2}/\d{4}\b)
+    |(?P<ampm>\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b)
+    |(?P<clock>\b\d{1,2}:\d{2}\b)
+    |(?P<number>\b\d+\b)
+    |(?P<word>[a-z][a-z'&.-]*)
+    |(?P<punct>[?,!;])
+    """,
+    re.VERBOSE,
+)
+AMPM_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)")
+
+WEEKDAYS = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+ROUTE_WORDS = {"route", "bus", "line"}
+STOP_WORDS = {"from", "leaving", "leave", "leaves", "at"}
+HEADSIGN_WORDS = {"to", "toward", "towards"}
+TERMINATORS = {
+    "on",
+    "at",
+    "around",
+    "after",
+    "before",
+    "by",
+    "today",
+    "tomorrow",
+    "now",
+} | HEADSIGN_WORDS | set(WEEKDAYS)
+DIRECTIONS = {"outbound": 0, "inbound": 1}
+BOARD_WORDS = {"leaving", "departing", "departures", "board", "now"}
+WEEK_WORDS = {"week", "week's", "weekly"}
+
+
+@dataclass
+class Token:
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class ParsedQuestion:
+    kind: str
+    route: str = None
+    from_text: str = None
+    to_text: str = None
+    stop_text: str = None
+    date: date = None
+    end_date: date = None
+    time: str = None
+    direction_id: int = None
+    headsign: str = None
+
+
+def tokenize(lowered):
+    return [
+        Token(m.lastgroup, m.group(), m.start(), m.end())
+        for m in TOKEN_RE.finditer(lowered)
+    ]
+
+
+def ampm_to_time(value):
+    m = AMPM_RE.match(value)
+    hour = int(m.group(1))
+    minute = int(m.group(2) or 0)
+    ampm = m.group(3)
+    if ampm == "pm" and hour != 12:
+        hour += 12
+    if ampm == "am" and hour == 12:
+        hour = 0
+    return f"{hour:02d}:{minute:02d}:00"
+
+
+def phrase_after(question, tokens, i):
+    start = end = None
+    for tok in tokens[i + 1:]:
+        if tok.kind not in ("word", "number"):
+            break
+        if tok.kind == "word" and tok.value in TERMINATORS:
+            break
+        if start is None:
+            start = tok.start
+        end = tok.end
+    if start is None:
+        return None
+    return question[start:end].strip()
+
+
+def parse_question(question, today=None, now=None):
+    today = today or date.today()
+    lowered = question.lower()
+    tokens = tokenize(lowered)
+
+    words = set()
+    route = None
+    q_date = None
+    weekday = None
+    q_time = None
+    direction_id = None
+    from_idx = to_idx = stop_idx = headsign_idx = None
+
+    for i, tok in enumerate(tokens):
+        kind = tok.kind
+        if kind == "word":
+            value = tok.value
+            words.add(value)
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            if value in ROUTE_WORDS or value == "the":
+                if route is None and nxt is not None and nxt.kind == "number":
+                    route = nxt.value
+            elif value in WEEKDAYS:
+                if weekday is None:
+                    weekday = WEEKDAYS[value]
+            elif value in DIRECTIONS:
+                direction_id = DIRECTIONS[value]
+
+            if value == "from" and from_idx is None:
+                from_idx = i
+            if value == "to" and from_idx is not None and to_idx is None:
+                to_idx = i
+            # only a stop word followed by a phrase claims the stop, so in
+            # "at around 5pm from X" the later "from X" still counts
+            if value in STOP_WORDS and stop_idx is None:
+                if value != "at" or (nxt is not None and nxt.kind == "word"):
+                    if phrase_after(question, tokens, i) is not None:
+                        stop_idx = i
+            if value in HEADSIGN_WORDS and headsign_idx is None:
+                headsign_idx = i
+        elif kind == "iso" and q_date is None:
+            y, m, d = tok.value.split("-")
+            q_date = date(int(y), int(m), int(d))
+        elif kind == "mdy" and q_date is None:
+            m, d, y = tok.value.split("/")
+            q_date = date(int(y), int(m), int(d))
+        elif kind == "ampm" and q_time is None:
+            q_time = ampm_to_time(tok.value)
+        elif kind == "clock" and q_time is None:
+            hour, minute = tok.value.split(":")
+            q_time = f"{int(hour):02d}:{int(minute):02d}:00"
+
+    if q_time is None and "now" in words:
+        q_time = (now or datetime.now()).strftime("%H:%M:00")
+
+    if q_date is None:
+        if weekday is not None:
+            q_date = today + timedelta(days=(weekday - today.weekday()) % 7)
+        elif "tomorrow" in words:
+            q_date = today + timedelta(days=1)
+        else:
+            q_date = today
+
+    from_text = to_text = None
+    if from_idx is not None and to_idx is not None:
+        from_text = phrase_after(question, tokens, from_idx)
+        to_text = phrase_after(question, tokens, to_idx)
+
+    if "fastest" in words and "from" in words and "to" in words:
+        kind = "fastest"
+    elif ("how" in words and "often" in words) or "frequency" in words:
+        kind = "headway"
+    elif words & WEEK_WORDS:
+        kind = "week"
+    elif "last" in words:
+        kind = "last"
+    elif "first" in words:
+        kind = "first"
+    elif route is None and words & BOARD_WORDS:
+        kind = "board"
+    elif q_time:
+        kind = "next"
+    else:
+        kind = "unknown"
+
+    stop_text = phrase_after(question, tokens, stop_idx) if stop_idx is not None else None
+    headsign = None
+    if kind != "fastest" and headsign_idx is not None:
+        headsign = phrase_after(question, tokens, headsign_idx)
+
+    end_date = None
+    if kind == "week":
+        if "next" in words and q_date == today:
+            q_date = today + timedelta(days=7)
+        end_date = q_date + timedelta(days=6)
+
+    return ParsedQuestion(
+        kind=kind,
+        route=route,
+        from_text=from_text,
+        to_text=to_text,
+        stop_text=stop_text,
+        date=q_date,
+        end_date=end_date,
+        time=q_time,
+        direction_id=direction_id,
+        headsign=headsign,
+    )
+
+
+def benchmark(questions, repeat=2000):
+    started = time_mod.perf_counter()
+    for _ in range(repeat):
+        for q in questions:
+            parse_question(q)
+    elapsed = time_mod.perf_counter() - started
+    return elapsed / (repeat * len(questions)) * 1e6
+
+
+def main():
+    questions = [
+        "When does route 5 leave Rosa Parks after 2:30 pm?",
+        "What's the last bus 12 leaving the hub today?",
+        "Fastest way from Reitz Union to Butler Plaza on 01/31/2026 at 2:50 pm?",
+        "How often does route 12 run toward The Hub on Monday?",
+        "What's leaving the hub now?",
+        "What is this week's service for route 5 at Rosa Parks?",
+    ]
+    for q in questions:
+        print(parse_question(q))
+    print(f"{benchmark(questions):.1f} us per question")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import json
+import threading
+import time
+import urllib.request
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from gtfs_time import secs_to_clock
+
+try:
+    from google.transit import gtfs_realtime_pb2
+except ImportError:  # protobuf bindings are optional; JSON feeds still work
+    gtfs_realtime_pb2 = None
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TRIP_UPDATES_PATH = BASE_DIR / "db" / "trip_updates.json"
+POLL_INTERVAL_SECS = 30
+CANCELED = {"CANCELED", "CANCELLED", 3}
+AGENCY_TIMEZONE = ZoneInfo("America/New_York")  # agency.txt agency_timezone
+
+
+def _get(d, *names):
+    for name in names:
+        if name in d:
+            return d[name]
+    return None
+
+
+def _delay(event):
+    if not event:
+        return None
+    return _get(event, "delay")
+
+
+def _time(event):
+    """StopTimeEvent.time (POSIX seconds); proto3 JSON writes int64 as a string."""
+    if not event:
+        return None
+    value = _get(event, "time")
+    return None if value is None else int(value)
+
+
+def _start_date(value):
+    """TripDescriptor.start_date (YYYYMMDD) as YYYY-MM-DD, or None."""
+    if not value:
+        return None
+    value = str(value).replace("-", "")
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+
+
+def service_date(date_str, day_offset=0):
+    """Service day of a trip on date_str's timeline (the day before for offset 86400)."""
+    if not day_offset:
+        return date_str
+    day = datetime.strptime(date_str, "%Y-%m-%d") - timedelta(seconds=day_offset)
+    return day.strftime("%Y-%m-%d")
+
+
+def day_start(date_str):
+    """POSIX time of date_str's 00:00:00 in GTFS terms (noon minus 12h, so
+    DST change days keep the schedule's own clock)."""
+    noon = datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, tzinfo=AGENCY_TIMEZONE)
+    return int(noon.timestamp()) - 12 * 3600
+
+
+def trip_updates_from_json(data):
+    """Yield (trip_id, start_date, canceled, trip_delay, stops) from a GTFS-RT
+    FeedMessage in JSON form (camelCase or snake_case keys); stops are
+    (seq, arr_delay, dep_delay, arr_time, dep_time), None where absent."""
+    feed = json.loads(data) if isinstance(data, (str, bytes)) else data
+    for entity in feed.get("entity", []):
+        update = _get(entity, "tripUpdate", "trip_update")
+        if not update:
+            continue
+        trip = update.get("trip", {})
+        trip_id = _get(trip, "tripId", "trip_id")
+        if not trip_id:
+            continue
+        relationship = _get(trip, "scheduleRelationship", "schedule_relationship")
+        stops = []
+        for stu in _get(update, "stopTimeUpdate", "stop_time_update") or []:
+            seq = _get(stu, "stopSequence", "stop_sequence")
+            if seq is None:
+                continue
+            arrival, departure = stu.get("arrival"), stu.get("departure")
+            stops.append(
+                (int(seq), _delay(arrival), _delay(departure), _time(arrival), _time(departure))
+            )
+        yield (
+            trip_id,
+            _start_date(_get(trip, "startDate", "start_date")),
+            relationship in CANCELED,
+            update.get("delay"),
+            stops,
+        )
+
+
+def trip_updates_from_protobuf(data):
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(data)
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        update = entity.trip_update
+        stops = []
+        for stu in update.stop_time_update:
+            if not stu.HasField("stop_sequence"):
+                continue
+            events = []
+            for name in ("arrival", "departure"):
+                event = getattr(stu, name)
+                has_event = stu.HasField(name)
+                events.append(
+                    (
+                        event.delay if has_event and event.HasField("delay") else None,
+                        event.time if has_event and event.HasField("time") else None,
+                    )
+                )
+            (arr_delay, arr_time), (dep_delay, dep_time) = events
+            stops.append((stu.stop_sequence, arr_delay, dep_delay, arr_time, dep_time))
+        yield (
+            update.trip.trip_id,
+            _start_date(update.trip.start_date) if update.trip.HasField("start_date") else None,
+            update.trip.schedule_relationship in CANCELED,
+            update.delay if update.HasField("delay") else None,
+            stops,
+        )
+
+
+def parse_trip_updates(data):
+    if isinstance(data, bytes) and not data.lstrip().startswith(b"{"):
+        if gtfs_realtime_pb2 is None:
+            raise RuntimeError("protobuf TripUpdates need gtfs-realtime-bindings installed")
+        return trip_updates_from_protobuf(data)
+    return trip_updates_from_json(data)
+
+
+class DelayMap:
+    """Per-trip delays keyed by stop_sequence, replaced wholesale per feed.
+
+    A stop without its own update takes the departure delay of the closest
+    earlier update on the trip (GTFS-RT propagation), or the trip-level delay
+    when no earlier update exists. Readers never lock: apply() builds a new
+    dict and swaps it in.
+
+    An event that carries only an absolute time (no delay) predicts its own
+    stop from that time; it is not propagated, since its delay would need the
+    scheduled time the feed does not repeat.
+
+    Updates are keyed by (trip_id, start_date) and only apply to that trip's
+    run on its service day. An update without a start_date applies only to
+    queries for the feed's own date (live_date), including the previous
+    day's trips running past 24:00 on it.
+    """
+
+    def __init__(self):
+        self._trips = {}
+        self._canceled = frozenset()
+        self.feed_timestamp = None
+        self.live_date = None
+        self.applied_at = None
+        self.apply_secs = None
+
+    def __len__(self):
+        return len(self._trips)
+
+    def apply(self, updates, feed_timestamp=None):
+        started = time.perf_counter()
+        trips = {}
+        canceled = set()
+        for trip_id, start_date, is_canceled, trip_delay, stops in updates:
+            key = (trip_id, start_date)
+            if is_canceled:
+                canceled.add(key)
+                continue
+            stops.sort()
+            seqs = [s[0] for s in stops]
+            arrivals = []
+            departures = []
+            arrival_times = []
+            departure_times = []
+            carried = []  # departure delay in effect from each update on
+            for _, arr, dep, arr_time, dep_time in stops:
+                arrivals.append(arr if arr is not None else dep)
+                departures.append(dep if dep is not None else arr)
+                arrival_times.append(arr_time if arr_time is not None else dep_time)
+                departure_times.append(dep_time if dep_time is not None else arr_time)
+                if departures[-1] is not None:
+                    carried.append(departures[-1])
+                else:
+                    carried.append(carried[-1] if carried else trip_delay)
+            trips[key] = (
+                seqs,
+                arrivals,
+                departures,
+                arrival_times,
+                departure_times,
+                carried,
+                trip_delay,
+            )
+        self._trips = trips
+        self._canceled = frozenset(canceled)
+        self.feed_timestamp = feed_timestamp
+        self.applied_at = time.time()
+        self.live_date = datetime.fromtimestamp(
+            feed_timestamp or self.applied_at, AGENCY_TIMEZONE
+        ).strftime("%Y-%m-%d")
+        self.apply_secs = time.perf_counter() - started
+        return len(trips) + len(canceled)
+
+    def clear(self):
+        self.apply([])
+
+    def canceled(self, trip_id, date_str, day_offset=0):
+        if not self._canceled:
+            return False
+        if (trip_id, service_date(date_str, day_offset)) in self._canceled:
+            return True
+        return date_str == self.live_date and (trip_id, None) in self._canceled
+
+    def _entry(self, trip_id, date_str, day_offset):
+        if not self._trips:
+            return None
+        entry = self._trips.get((trip_id, service_date(date_str, day_offset)))
+        if entry is None and date_str == self.live_date:
+            entry = self._trips.get((trip_id, None))
+        return entry
+
+    def delay(self, trip_id, stop_sequence, date_str, day_offset=0, arrival=False):
+        entry = self._entry(trip_id, date_str, day_offset)
+        if entry is None:
+            return None
+        seqs, arrivals, departures, _, _, carried, trip_delay = entry
+        seq = int(stop_sequence)
+        i = bisect_right(seqs, seq) - 1
+        if i < 0:
+            return trip_delay
+        if seqs[i] == seq:
+            own = arrivals[i] if arrival else departures[i]
+            if own is not None:
+                return own
+        return carried[i]
+
+    def predict(
+        self, trip_id, stop_sequence, scheduled_secs, date_str, day_offset=0, arrival=False
+    ):
+        if scheduled_secs is None:
+            return None
+        entry = self._entry(trip_id, date_str, day_offset)
+        if entry is None:
+            return scheduled_secs
+        seqs, arrivals, departures, arrival_times, departure_times, _, _ = entry
+        seq = int(stop_sequence)
+        i = bisect_right(seqs, seq) - 1
+        if i >= 0 and seqs[i] == seq:
+            own = arrivals[i] if arrival else departures[i]
+            event_time = arrival_times[i] if arrival else departure_times[i]
+            if own is None and event_time is not None:
+                return event_time - day_start(date_str)
+        delay = self.delay(trip_id, stop_sequence, date_str, day_offset, arrival)
+        return scheduled_secs if delay is None else scheduled_secs + delay
+
+
+DELAYS = DelayMap()
+
+
+def overlay_itinerary(itinerary, date_str, delays=DELAYS):
+    """Add predicted_* times to a one-transfer itinerary on date_str in place.
+
+    Returns False when a trip is canceled or the predicted transfer is missed;
+    an interlined continuation cannot be missed, the rider is already aboard.
+    """
+    first, second = itinerary["first_trip_id"], itinerary["second_trip_id"]
+    first_offset = itinerary.get("first_day_offset", 0)
+    second_offset = itinerary.get("second_day_offset", 0)
+    if delays.canceled(first, date_str, first_offset) or delays.canceled(
+        second, date_str, second_offset
+    ):
+        return False
+    depart = delays.predict(
+        first,
+        itinerary["first_board_seq"],
+        itinerary["first_depart_secs"],
+        date_str,
+        first_offset,
+    )
+    transfer = delays.predict(
+        first,
+        itinerary["first_alight_seq"],
+        itinerary["transfer_arrive_secs"],
+        date_str,
+        first_offset,
+        arrival=True,
+    )
+    second_depart = delays.predict(
+        second,
+        itinerary["second_board_seq"],
+        itinerary["second_depart_secs"],
+        date_str,
+        second_offset,
+    )
+    arrive = delays.predict(
+        second,
+        itinerary["second_alight_seq"],
+        itinerary["final_arrive_secs"],
+        date_str,
+        second_offset,
+        arrival=True,
+    )
+    itinerary.update(
+        {
+            "predicted_first_depart": secs_to_clock(depart),
+            "predicted_transfer_arrive": secs_to_clock(transfer),
+            "predicted_second_depart": secs_to_clock(second_depart),
+            "predicted_final_arrive": secs_to_clock(arrive),
+            "predicted_final_arrive_secs": arrive,
+        }
+    )
+    return itinerary.get("interlined", False) or transfer <= second_depart
+
+
+def overlay_itineraries(itineraries, date_str, delays=DELAYS):
+    """Predicted, still-connecting itineraries (all of them when no feed is loaded)."""
+    return [it for it in itineraries if overlay_itinerary(it, date_str, delays)]
+
+
+def load_trip_updates(source, delays=DELAYS):
+    """Read a feed from a file path or http(s) URL and apply it."""
+    source = str(source)
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=10) as resp:
+            data = resp.read()
+    else:
+        data = Path(source).read_bytes()
+    return delays.apply(parse_trip_updates(data))
+
+
+class TripUpdatePoller:
+    """Re-apply a TripUpdates source every `interval` seconds on a daemon thread.
+
+    Local files are only re-read when their mtime changes.
+    """
+
+    def __init__(self, source=TRIP_UPDATES_PATH, interval=POLL_INTERVAL_SECS, delays=DELAYS):
+        self.source = source
+        self.interval = interval
+        self.delays = delays
+        self.last_error = None
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        source = str(self.source)
+        if not source.startswith(("http://", "https://")):
+            mtime = Path(source).stat().st_mtime
+            if mtime == self._mtime:
+                return 0
+            self._mtime = mtime
+        return load_trip_updates(source, self.delays)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                self.last_error = None
+            except (OSError, ValueError, RuntimeError) as exc:
+                self.last_error = exc
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="trip-updates", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    count = load_trip_updates(TRIP_UPDATES_PATH)
+    print(f"Applied {count} trip updates in {DELAYS.apply_secs * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
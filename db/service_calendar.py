@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+
+ACTIVE_SERVICES_CTE = """
+WITH base_services AS (
+  SELECT c.service_id
+  FROM calendar c
+  WHERE :gtfs_date BETWEEN c.start_date AND c.end_date
+    AND (
+      (c.monday = 1 AND strftime('%w', :date) = '1') OR
+      (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
+      (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
+      (c.thursday = 1 AND strftime('%w', :date) = '4') OR
+      (c.friday = 1 AND strftime('%w', :date) = '5') OR
+      (c.saturday = 1 AND strftime('%w', :date) = '6') OR
+      (c.sunday = 1 AND strftime('%w', :date) = '0')
+    )
+),
+exception_add AS (
+  SELECT service_id
+  FROM calendar_dates
+  WHERE date = :gtfs_date AND exception_type = 1
+),
+exception_remove AS (
+  SELECT service_id
+  FROM calendar_dates
+  WHERE date = :gtfs_date AND exception_type = 2
+),
+active_services AS (
+  SELECT service_id FROM base_services
+  UNION
+  SELECT service_id FROM exception_add
+  EXCEPT
+  SELECT service_id FROM exception_remove
+)
+"""
+
+
+def to_gtfs_date(date_str):
+    return date_str.replace("-", "")
+
+
+def service_params(date_str):
+    return {"date": date_str, "gtfs_date": to_gtfs_date(date_str)}
+
+
+def service_dates(conn):
+    weekday_columns = [
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+    ]
+    dates = {}
+    for row in conn.execute(
+        "SELECT service_id, start_date, end_date, "
+        + ", ".join(weekday_columns)
+        + " FROM calendar;"
+    ):
+        service_id, start, end = row[0], row[1], row[2]
+        flags = [str(v) == "1" for v in row[3:]]
+        day = datetime.strptime(start, "%Y%m%d").date()
+        last = datetime.strptime(end, "%Y%m%d").date()
+        active = dates.setdefault(service_id, set())
+        while day <= last:
+            if flags[day.weekday()]:
+                active.add(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+
+    for service_id, gtfs_date, exception_type in conn.execute(
+        "SELECT service_id, date, exception_type FROM calendar_dates;"
+    ):
+        day = datetime.strptime(gtfs_date, "%Y%m%d").strftime("%Y-%m-%d")
+        active = dates.setdefault(service_id, set())
+        if str(exception_type) == "1":
+            active.add(day)
+        elif str(exception_type) == "2":
+            active.discard(day)
+
+    return {service_id: sorted(days) for service_id, days in dates.items()}
+
+
+def active_service_ids(conn, date_str):
+    sql = ACTIVE_SERVICES_CTE + "SELECT service_id FROM active_services;"
+    return [r[0] for r in conn.execute(sql, service_params(date_str))]
+
+
+def service_day_offsets(conn, date_str):
+    offsets = {}
+    for service_id, day_offset in conn.execute(
+        "SELECT service_id, day_offset FROM service_days WHERE service_date = ?;",
+        (date_str,),
+    ):
+        offsets.setdefault(day_offset, []).append(service_id)
+    return offsets
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from gtfs_time import secs_to_time
+from snapshots import connect_snapshot, current_snapshot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+
+
+def connect_db():
+    return connect_snapshot(current_snapshot(DB_PATH))
+
+
+def load_bitsets(conn):
+    epoch = None
+    bitsets = {}
+    for service_id, epoch_date, bits in conn.execute(
+        "SELECT service_id, epoch_date, bits FROM service_bitsets;"
+    ):
+        epoch = datetime.strptime(epoch_date, "%Y-%m-%d").date()
+        bitsets[service_id] = int(bits, 16)
+    return epoch, bitsets
+
+
+def service_stats(conn, route_short_name, stop_id_padded=None):
+    if stop_id_padded:
+        sql = """
+        SELECT t.service_id, MIN(st.departure_secs), MAX(st.departure_secs),
+               COUNT(DISTINCT st.trip_id)
+        FROM stops s
+        JOIN stop_times st ON st.stop_id = s.stop_id
+        JOIN trips t ON t.trip_id = st.trip_id
+        JOIN routes r ON r.route_id = t.route_id
+        WHERE r.route_short_name = :route
+          AND s.stop_id_padded = :stop_id
+        GROUP BY t.service_id;
+        """
+    else:
+        sql = """
+        SELECT t.service_id, MIN(tp.start_secs), MAX(tp.start_secs), COUNT(*)
+        FROM trips t
+        JOIN routes r ON r.route_id = t.route_id
+        JOIN trip_patterns tp ON tp.trip_id = t.trip_id
+        WHERE r.route_short_name = :route
+        GROUP BY t.service_id;
+        """
+    params = {"route": route_short_name, "stop_id": stop_id_padded}
+    return {r[0]: (r[1], r[2], r[3]) for r in conn.execute(sql, params)}
+
+
+def schedule_summary(conn, route_short_name, start_date, end_date, stop_id_padded=None):
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    stats = service_stats(conn, route_short_name, stop_id_padded)
+    epoch, bitsets = load_bitsets(conn)
+    bitsets = {sid: bits for sid, bits in bitsets.items() if sid in stats}
+
+    exceptions = {}
+    for service_id, gtfs_date, exception_type in conn.execute(
+        "SELECT service_id, date, exception_type FROM calendar_dates "
+        "WHERE date BETWEEN ? AND ?;",
+        (start.strftime("%Y%m%d"), end.strftime("%Y%m%d")),
+    ):
+        if service_id in stats:
+            day = datetime.strptime(gtfs_date, "%Y%m%d").date()
+            kind = "added" if str(exception_type) == "1" else "removed"
+            exceptions.setdefault(day, []).append({"service_id": service_id, "type": kind})
+
+    days = []
+    day = start
+    while day <= end:
+        offset = (day - epoch).days if epoch else -1
+        active = sorted(
+            sid for sid, bits in bitsets.items() if offset >= 0 and (bits >> offset) & 1
+        )
+        firsts = [stats[sid][0] for sid in active if stats[sid][0] is not None]
+        lasts = [stats[sid][1] for sid in active if stats[sid][1] is not None]
+        days.append(
+            {
+                "date": day.strftime("%Y-%m-%d"),
+                "weekday": day.strftime("%A"),
+                "services": active,
+                "first_departure": secs_to_time(min(firsts)) if firsts else None,
+                "last_departure": secs_to_time(max(lasts)) if lasts else None,
+                "trips": sum(stats[sid][2] for sid in active),
+                "exceptions": exceptions.get(day, []),
+            }
+        )
+        day += timedelta(days=1)
+    return days
+
+
+def main():
+    conn = connect_db()
+    try:
+        for d in schedule_summary(conn, "5", "2026-01-26", "2026-02-01", "0001"):
+            print(d)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
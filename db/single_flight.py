@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+from collections import Counter
+
+from gtfs_time import secs_to_time, time_to_secs
+
+
+TIME_BUCKET_SECS = 60
+
+
+def bucket_time(time_str, bucket_secs=TIME_BUCKET_SECS):
+    secs = time_to_secs(time_str)
+    if secs is None:
+        return time_str
+    return secs_to_time(secs - secs % bucket_secs)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _interrupted(exc):
+    # Connection.interrupt() from the leader's own caller cancelling says
+    # nothing about the query itself, so waiters run it again instead.
+    return isinstance(exc, sqlite3.OperationalError) and "interrupted" in str(exc)
+
+
+class SingleFlight:
+    """Run one call per key at a time and hand its result to every waiter.
+
+    Keys start with the query name so metrics can be reported per query.
+    Results are shared between callers, so they must be treated as read-only.
+    Errors reach every waiter, except an interrupt caused by the leader's
+    caller cancelling: waiters then start over and one of them leads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._requests = Counter()
+        self._coalesced = Counter()
+
+    def do(self, key, fn, *args, **kwargs):
+        name = key[0]
+        with self._lock:
+            self._requests[name] += 1
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                else:
+                    self._coalesced[name] += 1
+            if leader:
+                return self._lead(key, call, fn, args, kwargs)
+
+            call.event.wait()
+            if call.error is None:
+                return call.result
+            if not _interrupted(call.error):
+                raise call.error
+            with self._lock:
+                self._coalesced[name] -= 1
+
+    def _lead(self, key, call, fn, args, kwargs):
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                name: {
+                    "requests": requests,
+                    "executed": requests - self._coalesced[name],
+                    "coalesced": self._coalesced[name],
+                    "coalesced_rate": self._coalesced[name] / requests,
+                }
+                for name, requests in self._requests.items()
+            }
+
+    def reset_metrics(self):
+        with self._lock:
+            self._requests.clear()
+            self._coalesced.clear()
+
+
+SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
+KEEP_SNAPSHOTS = 3
+MMAP_SIZE = 1 << 30
+CHECK_INTERVAL_SECS = 2.0
+
+
+def snapshot_dir(db_path=None):
+    return Path(db_path or DB_PATH).parent / "snapshots"
+
+
+def pointer_path(db_path=None):
+    db_path = Path(db_path or DB_PATH)
+    return db_path.with_name(db_path.stem + ".current")
+
+
+def new_snapshot_path(db_path=None):
+    """Private file for a build to write; publish_snapshot() makes it live."""
+    directory = snapshot_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S")
+    path = directory / f"{Path(db_path or DB_PATH).stem}-{version}-{os.getpid()}.sqlite.tmp"
+    if path.exists():
+        path.unlink()
+    return path
+
+
+def _replace_atomically(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def publish_snapshot(built_path, db_path=None):
+    """Make a finished build the current snapshot.
+
+    The build file is renamed to its final versioned name, then the pointer
+    file is swapped with os.replace, so a reader sees either the old snapshot
+    or the new one, never a partial file. db_path is also swapped to a hard
+    link of the snapshot for callers that still open it directly (skipped
+    with a warning where the filesystem refuses). Snapshots beyond
+    KEEP_SNAPSHOTS are removed; readers holding one open keep their file
+    handle on POSIX.
+    """
+    db_path = Path(db_path or DB_PATH)
+    built_path = Path(built_path)
+    snapshot = built_path.with_name(built_path.name.removesuffix(".tmp"))
+    os.replace(built_path, snapshot)
+    _replace_atomically(pointer_path(db_path), snapshot.name)
+
+    link_tmp = db_path.with_name(db_path.name + ".tmp")
+    try:
+        if link_tmp.exists():
+            link_tmp.unlink()
+        os.link(snapshot, link_tmp)
+        os.replace(link_tmp, db_path)
+    except OSError as exc:
+        print(f"warning: {db_path} not updated ({exc}); readers use {snapshot.name}")
+
+    old = sorted(snapshot_dir(db_path).glob(f"{db_path.stem}-*.sqlite"))
+    for path in old[:-KEEP_SNAPSHOTS]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    return snapshot
+
+
+def current_snapshot(db_path=None):
+    pointer = pointer_path(db_path)
+    try:
+        name = pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return Path(db_path or DB_PATH)
+    return snapshot_dir(db_path) / name
+
+
+def connect_snapshot(path=None, check_same_thread=True):
+    """Read-only connection to a published (never modified) snapshot.
+
+    immutable=1 tells SQLite the file cannot change, so it takes no locks and
+    skips change detection; mmap serves pages straight from the page cache.
+    """
+    path = Path(path or current_snapshot())
+    conn = sqlite3.connect(
+        f"file:{path.as_posix()}?mode=ro&immutable=1",
+        uri=True,
+        check_same_thread=check_same_thread,
+    )
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class PerSnapshotCache:
+    """Values derived from a database file, built once per file.
+
+    Published snapshots never change, so a value stays valid for as long as
+    its file does; only the newest `keep` are held. The lock covers lookup,
+    build and eviction, so concurrent callers on a new snapshot build once.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn, build):
+        db_file = conn.execute("PRAGMA database_list;").fetchone()[2]
+        with self._lock:
+            value = self._values.get(db_file)
+            if value is None:
+                value = build(conn)
+                self._values[db_file] = value
+                while len(self._values) > self.keep:
+                    del self._values[next(iter(self._values))]
+            return value
+
+
+class SnapshotReader:
+    """Per-thread snapshot connections that follow the pointer file.
+
+    connection() re-reads the pointer at most every CHECK_INTERVAL_SECS and, when
+    a new snapshot was published, opens it and closes the thread's old
+    connection, so long-running readers pick up rebuilds without restarting.
+    """
+
+    def __init__(self, db_path=None, check_interval=CHECK_INTERVAL_SECS):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._local = threading.local()
+        self._conns = set()
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._current = current_snapshot(db_path)
+
+    def snapshot(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._current = current_snapshot(self.db_path)
+        return self._current
+
+    def connection(self):
+        path = self.snapshot()
+        local = self._local
+        if getattr(local, "path", None) != path:
+            old = getattr(local, "conn", None)
+            # check_same_thread=False only so close() can run from another thread
+            conn = connect_snapshot(path, check_same_thread=False)
+            with self._lock:
+                self._conns.add(conn)
+                if old is not None:
+                    self._conns.discard(old)
+            if old is not None:
+                old.close()
+            local.conn, local.path = conn, path
+        return local.conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
@@ -1,17 +1,43 @@
-import sqlite3
 from pathlib import Path
 
+from catalog import catalog_for
+from gtfs_time import secs_to_clock, time_to_secs
+from fares import fare_table, price_itinerary, rank_key
+from realtime import overlay_itineraries
+from snapshots import connect_snapshot, current_snapshot
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "db" / "rts_gtfs.sqlite"
 
 
 def search_fastest_one_transfer(
-    date, time, from_stop_id_padded, to_stop_id_padded, limit=3
+    date,
+    time,
+    from_stop_id_padded,
+    to_stop_id_padded,
+    limit=3,
+    conn=None,
+    rank="arrival",
 ):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """rank="arrival" orders by final arrival; "arrival_cost" breaks arrival
+    ties by total fare."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_snapshot(current_snapshot(DB_PATH))
+    try:
+        return _search(
+            conn, date, time, from_stop_id_padded, to_stop_id_padded, limit, rank
+        )
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _search(conn, date, time, from_stop_id_padded, to_stop_id_padded, limit, rank):
     cur = conn.cursor()
+    fares = fare_table(conn)
+    catalog = catalog_for(conn)
 
     cur.execute(
         "SELECT stop_id, stop_name FROM stops WHERE stop_id_padded = ?;",
@@ -31,48 +57,22 @@ def search_fastest_one_transfer(
         raise SystemExit("To stop not found")
     to_stop_id, to_name = to_row["stop_id"], to_row["stop_name"]
 
-    active_services_cte = """
-    WITH base_services AS (
-      SELECT c.service_id
-      FROM calendar c
-      WHERE :date BETWEEN c.start_date AND c.end_date
-        AND (
-          (c.monday = 1 AND strftime('%w', :date) = '1') OR
-          (c.tuesday = 1 AND strftime('%w', :date) = '2') OR
-          (c.wednesday = 1 AND strftime('%w', :date) = '3') OR
-          (c.thursday = 1 AND strftime('%w', :date) = '4') OR
-          (c.friday = 1 AND strftime('%w', :date) = '5') OR
-          (c.saturday = 1 AND strftime('%w', :date) = '6') OR
-          (c.sunday = 1 AND strftime('%w', :date) = '0')
-        )
-    ),
-    exception_add AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 1
-    ),
-    exception_remove AS (
-      SELECT service_id
-      FROM calendar_dates
-      WHERE date = :date AND exception_type = 2
-    ),
-    active_services AS (
-      SELECT service_id FROM base_services
-      UNION
-      SELECT service_id FROM exception_add
-      EXCEPT
-      SELECT service_id FROM exception_remove
-    )
+    # service_days lists, per date, the services running that day (offset 0)
+    # and the previous day's services with trips past 24:00 (offset 86400), so
+    # every time below lives on one seconds timeline for :date.
+    service_days_join = """
+    JOIN service_days sd ON sd.service_id = t.service_id AND sd.service_date = :date
     """
+    time_secs = time_to_secs(time) or 0
 
-    sql_transfer_candidates = active_services_cte + """
+    sql_transfer_candidates = """
     SELECT DISTINCT st_from.stop_id
     FROM stop_times st_from
     JOIN stop_times st_to ON st_to.trip_id = st_from.trip_id
     JOIN trips t ON t.trip_id = st_from.trip_id
-    JOIN active_services a ON a.service_id = t.service_id
+    """ + service_days_join + """
     WHERE st_to.stop_id = :to_stop_id
-      AND st_from.stop_sequence < st_to.stop_sequence;
+      AND CAST(st_from.stop_sequence AS INTEGER) < CAST(st_to.stop_sequence AS INTEGER);
     """
 
     transfer_stop_ids = set(
@@ -82,103 +82,148 @@ def search_fastest_one_transfer(
         ).fetchall()
     )
 
-    sql_first_leg = active_services_cte + """
-    SELECT st.trip_id, st.departure_time, st.stop_sequence,
-           r.route_short_name, t.trip_headsign
+    sql_first_leg = """
+    SELECT st.trip_id, st.departure_secs - sd.day_offset AS depart_secs,
+           sd.day_offset, st.stop_sequence
     FROM stop_times st
     JOIN trips t ON t.trip_id = st.trip_id
-    JOIN routes r ON r.route_id = t.route_id
-    JOIN active_services a ON a.service_id = t.service_id
+    """ + service_days_join + """
     WHERE st.stop_id = :from_stop_id
-      AND st.departure_time >= :time
-    ORDER BY st.departure_time
+      AND st.departure_secs >= :time_secs + sd.day_offset
+    ORDER BY depart_secs
     LIMIT 120;
     """
 
     first_legs = conn.execute(
         sql_first_leg,
-        {"date": date, "from_stop_id": from_stop_id, "time": time},
+        {"date": date, "from_stop_id": from_stop_id, "time_secs": time_secs},
     ).fetchall()
 
-    placeholders = ",".join("?" for _ in transfer_stop_ids) or "''"
-    stop_name_map = {}
-    if transfer_stop_ids:
-        for r in conn.execute(
-            f"SELECT stop_id, stop_name FROM stops WHERE stop_id IN ({placeholders});",
-            list(transfer_stop_ids),
-        ).fetchall():
-            stop_name_map[r[0]] = r[1]
-
-    sql_second_leg = active_services_cte + """
-    SELECT st_from.departure_time AS depart_time,
-           st_to.arrival_time AS arrive_time,
-           t.trip_id, r.route_short_name, t.trip_headsign
+    sql_second_leg = """
+    SELECT st_from.departure_secs - sd.day_offset AS depart_secs,
+           st_to.arrival_secs - sd.day_offset AS arrive_secs,
+           t.trip_id, st_from.stop_sequence AS board_seq,
+           st_to.stop_sequence AS alight_seq, sd.day_offset
     FROM stop_times st_from
     JOIN stop_times st_to ON st_to.trip_id = st_from.trip_id
     JOIN trips t ON t.trip_id = st_from.trip_id
-    JOIN routes r ON r.route_id = t.route_id
-    JOIN active_services a ON a.service_id = t.service_id
+    """ + service_days_join + """
     WHERE st_from.stop_id = :transfer_stop_id
       AND st_to.stop_id = :to_stop_id
-      AND st_from.stop_sequence < st_to.stop_sequence
-      AND st_from.departure_time >= :min_depart
-    ORDER BY st_to.arrival_time
+      AND CAST(st_from.stop_sequence AS INTEGER) < CAST(st_to.stop_sequence AS INTEGER)
+      AND st_from.departure_secs >= :min_depart + sd.day_offset
+    ORDER BY arrive_secs
     LIMIT 1;
     """
 
+    # Trip attributes and downstream stops come from the in-memory catalog;
+    # its strings are interned, so itineraries share them instead of copies.
     itineraries = []
     for leg in first_legs:
-        trip_id = leg["trip_id"]
-        depart_time = leg["departure_time"]
+        trip = catalog.trip_index[leg["trip_id"]]
+        depart_secs = leg["depart_secs"]
         seq = leg["stop_sequence"]
-        downstream = conn.execute(
-            """
-            SELECT stop_id, arrival_time, stop_sequence
-            FROM stop_times
-            WHERE trip_id = ? AND stop_sequence > ?
-            ORDER BY stop_sequence;
-            """,
-            (trip_id, seq),
-        ).fetchall()
-
-        for ds in downstream:
-            transfer_stop_id = ds["stop_id"]
-            if transfer_stop_id not in transfer_stop_ids:
+        offset = leg["day_offset"]
+        downstream = catalog.downstream(trip, seq)
+
+        connections = []
+        # The vehicle continuing into the next trip of its block: the rider
+        # stays aboard, so no same-stop match or second-leg query is needed.
+        via = catalog.interline(trip, to_stop_id) if downstream else None
+        if via is not None:
+            stop_id, arrive, alight_seq, following, board_seq, depart, final, final_seq = via
+            connections.append(
+                (
+                    stop_id,
+                    arrive - offset,
+                    alight_seq,
+                    following,
+                    board_seq,
+                    depart - offset,
+                    final - offset,
+                    final_seq,
+                    offset,
+                    True,
+                )
+            )
+        for transfer_stop_id, arrival_secs, alight_seq in downstream:
+            if transfer_stop_id not in transfer_stop_ids or arrival_secs is None:
                 continue
-            arrive_time = ds["arrival_time"]
+            arrive_secs = arrival_secs - offset
             row = conn.execute(
                 sql_second_leg,
                 {
                     "date": date,
                     "transfer_stop_id": transfer_stop_id,
                     "to_stop_id": to_stop_id,
-                    "min_depart": arrive_time,
+                    "min_depart": arrive_secs,
                 },
             ).fetchone()
             if not row:
                 continue
+            connections.append(
+                (
+                    transfer_stop_id,
+                    arrive_secs,
+                    alight_seq,
+                    catalog.trip_index[row["trip_id"]],
+                    row["board_seq"],
+                    row["depart_secs"],
+                    row["arrive_secs"],
+                    row["alight_seq"],
+                    row["day_offset"],
+                    False,
+                )
+            )
+
+        for (
+            transfer_stop_id,
+            arrive_secs,
+            alight_seq,
+            second,
+            second_board_seq,
+            second_depart_secs,
+            final_arrive_secs,
+            second_alight_seq,
+            second_offset,
+            interlined,
+        ) in connections:
+            itinerary = {
+                "first_route": catalog.route_short_name_of(trip),
+                "first_headsign": catalog.headsign_of(trip),
+                "first_depart": secs_to_clock(depart_secs),
+                "transfer_stop_id": transfer_stop_id,
+                "transfer_stop_name": catalog.stop_name_of(transfer_stop_id),
+                "transfer_arrive": secs_to_clock(arrive_secs),
+                "second_route": catalog.route_short_name_of(second),
+                "second_headsign": catalog.headsign_of(second),
+                "second_depart": secs_to_clock(second_depart_secs),
+                "final_arrive": secs_to_clock(final_arrive_secs),
+                "final_arrive_secs": final_arrive_secs,
+                "interlined": interlined,
+                "first_trip_id": catalog.trip_ids[trip],
+                "first_board_seq": seq,
+                "first_alight_seq": alight_seq,
+                "first_depart_secs": depart_secs,
+                "transfer_arrive_secs": arrive_secs,
+                "second_trip_id": catalog.trip_ids[second],
+                "second_board_seq": second_board_seq,
+                "second_alight_seq": second_alight_seq,
+                "second_depart_secs": second_depart_secs,
+                "first_day_offset": offset,
+                "second_day_offset": second_offset,
+            }
             itineraries.append(
-                {
-                    "first_route": leg["route_short_name"],
-                    "first_headsign": leg["trip_headsign"],
-                    "first_depart": depart_time,
-                    "transfer_stop_id": transfer_stop_id,
-                    "transfer_stop_name": stop_name_map.get(
-                        transfer_stop_id, transfer_stop_id
-                    ),
-                    "transfer_arrive": arrive_time,
-                    "second_route": row["route_short_name"],
-                    "second_headsign": row["trip_headsign"],
-                    "second_depart": row["depart_time"],
-                    "final_arrive": row["arrive_time"],
-                }
+                price_itinerary(fares, itinerary, depart_secs, second_depart_secs)
             )
 
-    conn.close()
+    # Predicted times from the GTFS-RT delay map; drops canceled trips and
+    # connections the delays break.
+    itineraries = overlay_itineraries(itineraries, date)
 
     seen = set()
     unique = []
-    for it in sorted(itineraries, key=lambda x: x["final_arrive"]):
+    for it in sorted(itineraries, key=rank_key(rank)):
         key = (it["first_depart"], it["transfer_stop_id"], it["second_depart"])
         if key in seen:
             continue
@@ -0,0 +1,432 @@
+import csv
+import json
+import re
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from build_gtfs_db import GTFS_DIR
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REPORT_PATH = BASE_DIR / "db" / "gtfs_validation_report.json"
+MAX_SAMPLES = 5
+
+REQUIRED_FILES = ["agency.txt", "stops.txt", "routes.txt", "trips.txt", "stop_times.txt"]
+TIME_RE = re.compile(r"^\d{1,3}:[0-5]\d:[0-5]\d$")
+DATE_RE = re.compile(r"^\d{8}$")
+WEEKDAY_COLUMNS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+
+class TableScan:
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.issues = {}
+        self.keys = {}
+        self.refs = {}
+
+    def issue(self, check, severity, line, row):
+        entry = self.issues.setdefault(
+            check, {"severity": severity, "count": 0, "samples": []}
+        )
+        entry["count"] += 1
+        if len(entry["samples"]) < MAX_SAMPLES:
+            entry["samples"].append({"line": line, "row": row})
+
+    def key(self, name, value, line, row):
+        seen = self.keys.setdefault(name, set())
+        if value in seen:
+            self.issue(f"duplicate_{name}", "error", line, row)
+        seen.add(value)
+
+    def ref(self, name, value, line, row):
+        if not value:
+            return
+        refs = self.refs.setdefault(name, {})
+        if value not in refs:
+            refs[value] = {"line": line, "row": row}
+
+    def result(self):
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "issues": self.issues,
+            "keys": self.keys,
+            "refs": self.refs,
+        }
+
+
+def parse_time(value):
+    if not TIME_RE.match(value):
+        return None
+    h, m, s = value.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def valid_date(value):
+    if not DATE_RE.match(value):
+        return False
+    try:
+        datetime.strptime(value, "%Y%m%d")
+    except ValueError:
+        return False
+    return True
+
+
+def iter_rows(scan, path):
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            scan.issue("missing_header", "error", 1, {})
+            return
+        stripped_header = [h.strip() for h in header]
+        if stripped_header != header:
+            scan.issue("padded_header", "warning", 1, {"header": header})
+        for line, raw in enumerate(reader, start=2):
+            if not raw or all(not cell for cell in raw):
+                continue
+            scan.rows += 1
+            if len(raw) != len(header):
+                scan.issue("row_width_mismatch", "error", line, {"cells": raw})
+            if any(cell != cell.strip() for cell in raw):
+                scan.issue("padded_field", "warning", line, {"cells": raw})
+            values = [cell.strip() for cell in raw]
+            yield line, dict(zip(stripped_header, values))
+
+
+def scan_stops(scan, rows):
+    coords = []
+    for line, row in rows:
+        scan.key("stop_id", row.get("stop_id", ""), line, row)
+        scan.ref("parent_station", row.get("parent_station", ""), line, row)
+        try:
+            lat = float(row.get("stop_lat", ""))
+            lon = float(row.get("stop_lon", ""))
+        except ValueError:
+            if row.get("location_type", "0") in ("", "0", "1", "2"):
+                scan.issue("invalid_coordinates", "error", line, row)
+            continue
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            scan.issue("coordinates_out_of_range", "error", line, row)
+        elif lat == 0 and lon == 0:
+            scan.issue("coordinates_zero", "error", line, row)
+        else:
+            coords.append((lat, lon, line, row))
+
+    if coords:
+        mid_lat = statistics.median(c[0] for c in coords)
+        mid_lon = statistics.median(c[1] for c in coords)
+        for lat, lon, line, row in coords:
+            if abs(lat - mid_lat) > 1.0 or abs(lon - mid_lon) > 1.0:
+                scan.issue("coordinates_far_from_network", "warning", line, row)
+
+
+def scan_routes(scan, rows):
+    for line, row in rows:
+        scan.key("route_id", row.get("route_id", ""), line, row)
+        if not row.get("route_short_name") and not row.get("route_long_name"):
+            scan.issue("route_without_name", "error", line, row)
+        if not row.get("route_type", "").isdigit():
+            scan.issue("invalid_route_type", "error", line, row)
+
+
+def scan_trips(scan, rows):
+    for line, row in rows:
+        scan.key("trip_id", row.get("trip_id", ""), line, row)
+        scan.ref("route_id", row.get("route_id", ""), line, row)
+        scan.ref("service_id", row.get("service_id", ""), line, row)
+        scan.ref("shape_id", row.get("shape_id", ""), line, row)
+        if row.get("direction_id", "") not in ("", "0", "1"):
+            scan.issue("invalid_direction_id", "error", line, row)
+
+
+def check_trip_times(scan, stops):
+    prev_seq = None
+    prev_secs = None
+    for line, row, seq, arrival, departure in sorted(stops, key=lambda s: s[2]):
+        if seq == prev_seq:
+            scan.issue("duplicate_stop_sequence", "error", line, row)
+        if arrival is not None and departure is not None and departure < arrival:
+            scan.issue("departure_before_arrival", "error", line, row)
+        current = arrival if arrival is not None else departure
+        if current is not None and prev_secs is not None and current < prev_secs:
+            scan.issue("time_not_monotonic", "error", line, row)
+        prev_seq = seq
+        if departure is not None or arrival is not None:
+            prev_secs = departure if departure is not None else arrival
+
+
+def scan_stop_times(scan, rows):
+    current_trip = None
+    stops = []
+    closed_trips = set()
+    for line, row in rows:
+        trip_id = row.get("trip_id", "")
+        scan.ref("trip_id", trip_id, line, row)
+        scan.ref("stop_id", row.get("stop_id", ""), line, row)
+
+        arrival_text = row.get("arrival_time", "")
+        departure_text = row.get("departure_time", "")
+        arrival = parse_time(arrival_text) if arrival_text else None
+        departure = parse_time(departure_text) if departure_text else None
+        if (arrival_text and arrival is None) or (departure_text and departure is None):
+            scan.issue("invalid_time_format", "error", line, row)
+        seq_text = row.get("stop_sequence", "")
+        if not seq_text.isdigit():
+            scan.issue("invalid_stop_sequence", "error", line, row)
+            continue
+
+        if trip_id != current_trip:
+            if stops:
+                check_trip_times(scan, stops)
+                closed_trips.add(current_trip)
+            if trip_id in closed_trips:
+                scan.issue("stop_times_not_grouped_by_trip", "warning", line, row)
+            current_trip = trip_id
+            stops = []
+        stops.append((line, row, int(seq_text), arrival, departure))
+    if stops:
+        check_trip_times(scan, stops)
+
+
+def scan_calendar(scan, rows):
+    for line, row in rows:
+        scan.key("service_id", row.get("service_id", ""), line, row)
+        start, end = row.get("start_date", ""), row.get("end_date", "")
+        if not valid_date(start) or not valid_date(end):
+            scan.issue("invalid_date_format", "error", line, row)
+        elif start > end:
+            scan.issue("start_after_end", "error", line, row)
+        flags = [row.get(c, "") for c in WEEKDAY_COLUMNS]
+        if any(flag not in ("0", "1") for flag in flags):
+            scan.issue("invalid_weekday_flag", "error", line, row)
+        elif not any(flag == "1" for flag in flags):
+            scan.issue("service_without_weekdays", "warning", line, row)
+
+
+def scan_calendar_dates(scan, rows):
+    seen = set()
+    for line, row in rows:
+        service_id = row.get("service_id", "")
+        scan.keys.setdefault("service_id", set()).add(service_id)
+        key = (service_id, row.get("date", ""))
+        if key in seen:
+            scan.issue("duplicate_service_date", "error", line, row)
+        seen.add(key)
+        if not valid_date(row.get("date", "")):
+            scan.issue("invalid_date_format", "error", line, row)
+        if row.get("exception_type", "") not in ("1", "2"):
+            scan.issue("invalid_exception_type", "error", line, row)
+
+
+def scan_shapes(scan, rows):
+    last = {}
+    for line, row in rows:
+        shape_id = row.get("shape_id", "")
+        scan.keys.setdefault("shape_id", set()).add(shape_id)
+        try:
+            lat = float(row.get("shape_pt_lat", ""))
+            lon = float(row.get("shape_pt_lon", ""))
+            seq = int(row.get("shape_pt_sequence", ""))
+        except ValueError:
+            scan.issue("invalid_shape_point", "error", line, row)
+            continue
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+            scan.issue("coordinates_out_of_range", "error", line, row)
+        if shape_id in last and seq <= last[shape_id]:
+            scan.issue("shape_sequence_not_increasing", "error", line, row)
+        last[shape_id] = seq
+
+
+def scan_fare_attributes(scan, rows):
+    for line, row in rows:
+        scan.key("fare_id", row.get("fare_id", ""), line, row)
+        try:
+            float(row.get("price", ""))
+        except ValueError:
+            scan.issue("invalid_price", "error", line, row)
+
+
+def scan_fare_rules(scan, rows):
+    for line, row in rows:
+        scan.ref("fare_id", row.get("fare_id", ""), line, row)
+        scan.ref("route_id", row.get("route_id", ""), line, row)
+
+
+def scan_feed_info(scan, rows):
+    for line, row in rows:
+        for col in ("feed_start_date", "feed_end_date"):
+            if row.get(col) and not valid_date(row[col]):
+                scan.issue("invalid_date_format", "error", line, row)
+
+
+def scan_generic(scan, rows):
+    for _ in rows:
+        pass
+
+
+SCANNERS = {
+    "stops.txt": scan_stops,
+    "routes.txt": scan_routes,
+    "trips.txt": scan_trips,
+    "stop_times.txt": scan_stop_times,
+    "calendar.txt": scan_calendar,
+    "calendar_dates.txt": scan_calendar_dates,
+    "shapes.txt": scan_shapes,
+    "fare_attributes.txt": scan_fare_attributes,
+    "fare_rules.txt": scan_fare_rules,
+    "feed_info.txt": scan_feed_info,
+}
+
+# (referencing table, ref name, referenced table, key name)
+REFERENCES = [
+    ("trips", "route_id", "routes", "route_id"),
+    ("trips", "service_id", "calendar+calendar_dates", "service_id"),
+    ("trips", "shape_id", "shapes", "shape_id"),
+    ("stop_times", "trip_id", "trips", "trip_id"),
+    ("stop_times", "stop_id", "stops", "stop_id"),
+    ("stops", "parent_station", "stops", "stop_id"),
+    ("fare_rules", "fare_id", "fare_attributes", "fare_id"),
+    ("fare_rules", "route_id", "routes", "route_id"),
+]
+
+# (table with keys, key name, referencing table)
+UNUSED = [
+    ("trips", "trip_id", "stop_times"),
+    ("stops", "stop_id", "stop_times"),
+    ("routes", "route_id", "trips"),
+]
+
+
+def scan_file(path):
+    scan = TableScan(path.stem)
+    scanner = SCANNERS.get(path.name, scan_generic)
+    scanner(scan, iter_rows(scan, path))
+    return scan.result()
+
+
+def merge_keys(results, table, key):
+    if table == "calendar+calendar_dates":
+        tables = ["calendar", "calendar_dates"]
+    else:
+        tables = [table]
+    present = [t for t in tables if t in results]
+    if not present:
+        return None
+    keys = set()
+    for t in present:
+        keys |= results[t]["keys"].get(key, set())
+    return keys
+
+
+def cross_check(results):
+    checks = []
+    for src, ref, dst, key in REFERENCES:
+        if src not in results:
+            continue
+        keys = merge_keys(results, dst, key)
+        refs = results[src]["refs"].get(ref, {})
+        if keys is None:
+            if refs and dst != "shapes":
+                checks.append(
+                    {
+                        "check": f"{src}.{ref} references missing table {dst}",
+                        "severity": "error",
+                        "count": len(refs),
+                        "samples": list(refs.values())[:MAX_SAMPLES],
+                    }
+                )
+            continue
+        missing = [sample for value, sample in refs.items() if value not in keys]
+        if missing:
+            checks.append(
+                {
+                    "check": f"{src}.{ref} not found in {dst}.{key}",
+                    "severity": "error",
+                    "count": len(missing),
+                    "samples": missing[:MAX_SAMPLES],
+                }
+            )
+
+    for table, key, src in UNUSED:
+        if table not in results or src not in results:
+            continue
+        used = results[src]["refs"].get(key, {})
+        unused = sorted(results[table]["keys"].get(key, set()) - used.keys())
+        if unused:
+            checks.append(
+                {
+                    "check": f"{table}.{key} never used by {src}",
+                    "severity": "warning",
+                    "count": len(unused),
+                    "samples": unused[:MAX_SAMPLES],
+                }
+            )
+    return checks
+
+
+def validate_feed(feed_dir, workers=None):
+    started = time.perf_counter()
+    feed_dir = Path(feed_dir)
+    checks = []
+    missing = [name for name in REQUIRED_FILES if not (feed_dir / name).exists()]
+    if not any((feed_dir / name).exists() for name in ("calendar.txt", "calendar_dates.txt")):
+        missing.append("calendar.txt or calendar_dates.txt")
+    for name in missing:
+        checks.append(
+            {
+                "check": f"missing required file {name}",
+                "severity": "error",
+                "count": 1,
+                "samples": [],
+            }
+        )
+
+    paths = sorted(feed_dir.glob("*.txt"))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = {r["table"]: r for r in pool.map(scan_file, paths)}
+
+    for table, r in sorted(results.items()):
+        for check, entry in sorted(r["issues"].items()):
+            checks.append({"check": f"{table}: {check}", **entry})
+    checks.extend(cross_check(results))
+
+    return {
+        "feed_dir": str(feed_dir),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_secs": round(time.perf_counter() - started, 3),
+        "tables": {t: r["rows"] for t, r in sorted(results.items())},
+        "errors": sum(1 for c in checks if c["severity"] == "error"),
+        "warnings": sum(1 for c in checks if c["severity"] == "warning"),
+        "checks": checks,
+    }
+
+
+def main():
+    if not GTFS_DIR.exists():
+        raise SystemExit(f"GTFS folder not found: {GTFS_DIR}")
+    report = validate_feed(GTFS_DIR)
+    with REPORT_PATH.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(
+        f"Feed validation ({report['elapsed_secs']}s): "
+        f"{report['errors']} error checks, {report['warnings']} warning checks"
+    )
+    for c in report["checks"]:
+        print(f"- [{c['severity']}] {c['check']}: {c['count']}")
+
+
+if __name__ == "__main__":
+    main()